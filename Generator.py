@@ -1,10 +1,17 @@
-import tkinter as tk
-from tkinter import messagebox, filedialog, ttk
 import json
+import re
 import os
+import sys
+import io
+import argparse
+import contextlib
 import glob
 import numpy as np
 import copy
+import hashlib
+import bisect
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # --- PATH SETUP ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,8 +20,28 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DONOR_BLUEPRINT = os.path.join(BASE_DIR, "donor.blueprint")
 GUIDMAP_FILES = ["guidmap.json"]
 SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
+SOLVE_CACHE_DIR = os.path.join(BASE_DIR, "solve_cache")
+SOLVE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MATERIAL_CACHE_FILE = os.path.join(SOLVE_CACHE_DIR, "materials.json")
+MATERIALS = ["Alloy", "Metal", "Wood", "Heavy", "Stone"]
+BLOCK_MATERIAL_NAMES = {"Heavy": "heavy armour"} # Material as it is spelled in block names, if not just lowercase
+BLOCK_NAME_ALIASES = {"light-weight alloy block": "alloy block"}
+
+# Part of every solve cache key and of the material cache. Bump it when a change
+# alters the generated blocks or how block names are read (BlockIndex.tokenize,
+# BLOCK_NAME_ALIASES, BLOCK_MATERIAL_NAMES), so stale caches are no longer used.
+GENERATOR_VERSION = "1.4"
 
 OUTPUT_FILENAME = "generated_hull.blueprint"
+SAVE_CHUNK_BLOCKS = 65536 # Blocks serialized per write; bounds the writer's extra memory
+
+# --- SOLVER SETTINGS ---
+MAX_SOLVER_WORKERS = os.cpu_count() or 1
+PREVIEW_TIME_BUDGET = 0.05 # Seconds the live block count may spend solving
+ADAPTIVE_TRIAL_BUDGET = 12 # Default max trials for the adaptive solver
+UNDERCUT_WALK_LIMIT = 50 # Longest beam run an undercut offset may extend by
+SOLVER_MODES = ["sweep", "adaptive", "optimal"]
+UNDERCUT_MODES = ["trace", "inset"]
 
 # --- ROTATION SETTINGS ---
 ROT_BEAM      = 0 
@@ -25,6 +52,23 @@ ROT_RIGHT_OUT = 16
 ROT_LEFT_STERN  = 19  
 ROT_RIGHT_STERN = 17  
 
+# Placements only hold the starboard (+x) half of the hull; save_to_blueprint
+# writes the port twin of each mirrored block with the opposite hand.
+MIRROR_ROT = {ROT_BEAM: ROT_BEAM, ROT_LEFT_IN: ROT_RIGHT_IN, ROT_RIGHT_IN: ROT_LEFT_IN,
+              ROT_LEFT_OUT: ROT_RIGHT_OUT, ROT_RIGHT_OUT: ROT_LEFT_OUT}
+
+# --- PLACEMENT TABLE ---
+KIND_BEAM   = 0
+KIND_SLOPE  = 1
+KIND_OFFSET = 2 # Undercut offsets; treated like slopes by the next undercut layer
+KIND_BY_TYPE = {"beam": KIND_BEAM, "slope": KIND_SLOPE}
+
+# 15 bytes a row. int16 coordinates cover hulls up to 32767m long. A row with
+# layers = n stands for n stacked copies at y, y-1 .. y-n+1 (see expand_layers()).
+PLACEMENT_DTYPE = np.dtype([("x", np.int16), ("y", np.int16), ("z", np.int16), ("rot", np.uint8),
+                            ("block", np.uint16), ("len", np.uint8), ("kind", np.uint8),
+                            ("is_stern", np.bool_), ("mirror", np.bool_), ("layers", np.uint16)])
+
 # --- VISUAL THEME ---
 THEME_BG = "#C4F4FF"          
 THEME_GRID_MINOR = "#BCE8F2"  
@@ -49,11 +93,17 @@ class HullDesigner:
         self.var_floor = tk.BooleanVar(value=True)
         self.var_save_path = tk.StringVar(value="")
         self.var_material = tk.StringVar(value="Alloy") 
+        self.var_solver = tk.StringVar(value="Sweep")
+        self.var_workers = tk.IntVar(value=1)
+        self.var_undercut_mode = tk.StringVar(value="Trace")
         
         # Logical Dimensions
         self.var_limit_width = tk.IntVar(value=40) 
         self.var_limit_length = tk.IntVar(value=100) 
         
+        # Solver state carried between exports so point edits only re-solve the changed tail
+        self.hull_solver = None
+        
         # View State
         self.grid_size = 10.0 
         self.offset_x = 0
@@ -100,6 +150,8 @@ class HullDesigner:
         self.lbl_stats_len.pack(anchor="w")
         self.lbl_stats_beam = tk.Label(grp_stats, text="Beam: 1m", width=15, anchor="w", **lbl_opts)
         self.lbl_stats_beam.pack(anchor="w")
+        self.lbl_stats_blocks = tk.Label(grp_stats, text="Wall Blocks: -", width=15, anchor="w", **lbl_opts)
+        self.lbl_stats_blocks.pack(anchor="w")
 
         # --- DESIGN LIMITS ---
         grp_canvas = tk.LabelFrame(self.controls, text="Design Limits", bg=THEME_PANEL_BG, font=("MS Sans Serif", 9))
@@ -117,8 +169,7 @@ class HullDesigner:
         
         tk.Label(grp_dim, text="Material:", **lbl_opts).pack(anchor="w")
         # Restricted material options per user request
-        mat_options = ["Alloy", "Metal", "Wood", "Heavy", "Stone"]
-        self.cbo_mat = ttk.Combobox(grp_dim, textvariable=self.var_material, values=mat_options, state="readonly", width=12)
+        self.cbo_mat = ttk.Combobox(grp_dim, textvariable=self.var_material, values=MATERIALS, state="readonly", width=12)
         self.cbo_mat.pack(pady=2)
 
         tk.Label(grp_dim, text="Deck Height:", **lbl_opts).pack(anchor="w")
@@ -126,9 +177,18 @@ class HullDesigner:
         
         tk.Label(grp_dim, text="Undercut Layers:", **lbl_opts).pack(anchor="w")
         tk.Spinbox(grp_dim, from_=0, to=20, textvariable=self.var_undercut, width=10).pack(pady=2)
+
+        tk.Label(grp_dim, text="Undercut Style:", **lbl_opts).pack(anchor="w")
+        ttk.Combobox(grp_dim, textvariable=self.var_undercut_mode, values=["Trace", "Inset"], state="readonly", width=12).pack(pady=2)
         
         tk.Checkbutton(grp_dim, text="Generate Floor", variable=self.var_floor, bg=THEME_PANEL_BG).pack(anchor="w", pady=5)
 
+        tk.Label(grp_dim, text="Solver:", **lbl_opts).pack(anchor="w")
+        ttk.Combobox(grp_dim, textvariable=self.var_solver, values=["Sweep", "Adaptive", "Optimal"], state="readonly", width=12).pack(pady=2)
+
+        tk.Label(grp_dim, text="Solver Workers:", **lbl_opts).pack(anchor="w")
+        tk.Spinbox(grp_dim, from_=1, to=MAX_SOLVER_WORKERS, textvariable=self.var_workers, width=10).pack(pady=2)
+
         self.lbl_info = tk.Label(self.controls, text="L-Click: Add Point\nR-Click: Undo\n\nDraw on either side\nof the center line.", 
                                  justify=tk.LEFT, bg=THEME_PANEL_BG, fg="#444")
         self.lbl_info.pack(pady=15)
@@ -314,6 +374,27 @@ class HullDesigner:
             b = max_x * 2 + 1
         self.lbl_stats_len.config(text=f"Length: {l}m")
         self.lbl_stats_beam.config(text=f"Beam: {b}m")
+        self.update_block_preview()
+
+    def update_block_preview(self):
+        # Rough wall block count from whatever layout the solver finds within the preview budget
+        if len(self.points) < 2:
+            self.lbl_stats_blocks.config(text="Wall Blocks: -")
+            return
+        try:
+            generator = BlueprintGenerator(self.build_profile(), int(self.var_limit_width.get()), int(self.var_height.get()),
+                                           int(self.var_undercut.get()), self.var_floor.get(), "", self.var_material.get(),
+                                           solver=self.hull_solver)
+        except (tk.TclError, ValueError, GeneratorError):
+            # A spinbox mid-edit holds partial text, or the hull is out of range: show no count
+            self.lbl_stats_blocks.config(text="Wall Blocks: -")
+            return
+        count = generator.estimate_wall_blocks(PREVIEW_TIME_BUDGET)
+        self.hull_solver = generator.solver
+        self.lbl_stats_blocks.config(text=f"Wall Blocks: {count}")
+
+    def build_profile(self):
+        return profile_from_points(self.points)
 
     def add_point(self, event):
         raw_gx, raw_gz = self.to_grid(event.x, event.y)
@@ -357,12 +438,7 @@ class HullDesigner:
 
     def run_generator(self):
         if len(self.points) < 2: return
-        max_z = self.points[-1][0]
-        z_coords = [p[0] for p in self.points]
-        x_coords = [p[1] for p in self.points]
-        full_z = np.arange(max_z + 1)
-        full_x = np.interp(full_z, z_coords, x_coords)
-        hull_profile = np.round(full_x).astype(int)
+        hull_profile = self.build_profile()
         
         height = int(self.var_height.get())
         undercut = int(self.var_undercut.get())
@@ -370,9 +446,18 @@ class HullDesigner:
         center_offset = int(self.var_limit_width.get())
         save_path = self.var_save_path.get()
         material = self.var_material.get() 
+        solver_mode = self.var_solver.get().lower()
+        workers = int(self.var_workers.get())
+        undercut_mode = self.var_undercut_mode.get().lower()
         
-        generator = BlueprintGenerator(hull_profile, center_offset, height, undercut, do_floor, save_path, material)
-        generator.generate()
+        try:
+            generator = BlueprintGenerator(hull_profile, center_offset, height, undercut, do_floor, save_path, material, solver_mode, workers,
+                                           solver=self.hull_solver, undercut_mode=undercut_mode)
+            generator.generate()
+        except GeneratorError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.hull_solver = generator.solver
         
         if save_path:
             final_location = os.path.join(save_path, OUTPUT_FILENAME)
@@ -382,32 +467,323 @@ class HullDesigner:
         messagebox.showinfo("Success", f"Generated {final_location}")
 
 
-class BlueprintGenerator:
-    def __init__(self, profile, center_offset, height, undercut, do_floor, save_path, material):
-        self.profile = profile
-        self.center_offset = center_offset
-        self.height = height
-        self.undercut = undercut
-        self.do_floor = do_floor
-        self.save_path = save_path
-        self.material = material
-        self.placements = [] 
-        
-        # Initialize empty dictionaries (No hardcoding!)
-        self.beam_guids = {}
-        self.slope_guids = {}
-        self.offset_guids = {} 
-        self.load_assets()
-
-
-    def load_assets(self):
-        # Reset to ensure clean state
-        self.beam_guids = {}
-        self.slope_guids = {}
-        self.offset_guids = {}
+class PlacementTable:
+    """Placed blocks as one NumPy structured array of PLACEMENT_DTYPE rows.
+
+    The block column indexes guids. Tables made by filter()/concat() share the
+    same GUID registry, so their block ids stay comparable.
+    """
+
+    def __init__(self, guids=None, rows=None):
+        self.guids = guids if guids is not None else []
+        self.guid_index = {g: i for i, g in enumerate(self.guids)}
+        self.rows = rows if rows is not None else np.zeros(0, dtype=PLACEMENT_DTYPE)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_placements(cls, placements):
+        # Solver output (list of placement dicts) -> table
+        table = cls()
+        table.append(table.batch([p['pos'][0] for p in placements], [p['pos'][1] for p in placements],
+                                 [p['pos'][2] for p in placements], [p['rot'] for p in placements],
+                                 [table.block_id(p['guid']) for p in placements],
+                                 [p['props']['len'] for p in placements],
+                                 [KIND_BY_TYPE[p['props']['type']] for p in placements],
+                                 [p['props']['is_stern'] for p in placements],
+                                 [p['mirror'] for p in placements]))
+        return table
+
+    def block_id(self, guid):
+        if guid not in self.guid_index:
+            self.guid_index[guid] = len(self.guids)
+            self.guids.append(guid)
+        return self.guid_index[guid]
+
+    @staticmethod
+    def batch(x, y, z, rot, block, length, kind, is_stern=False, mirror=False, layers=1):
+        # Rows from columns; scalars are broadcast against the array columns.
+        columns = np.broadcast_arrays(x, y, z, rot, block, length, kind, is_stern, mirror, layers)
+        rows = np.zeros(columns[0].shape, dtype=PLACEMENT_DTYPE)
+        for name, column in zip(PLACEMENT_DTYPE.names, columns):
+            rows[name] = column
+        return rows
+
+    def append(self, rows):
+        self.rows = np.concatenate([self.rows, rows])
+
+    def with_rows(self, rows):
+        table = copy.copy(self) # Shares guids/guid_index
+        table.rows = rows
+        return table
+
+    def filter(self, mask):
+        return self.with_rows(self.rows[mask])
+
+    def bottom_layer(self):
+        # (lowest y, the single-layer rows that sit at it)
+        rows = self.rows
+        floor_y = rows["y"].astype(np.int64) - rows["layers"] + 1
+        min_y = floor_y.min()
+        bottom = rows[floor_y == min_y]
+        bottom["y"] = min_y
+        bottom["layers"] = 1
+        return min_y, bottom
+
+    @staticmethod
+    def expand_layers(rows):
+        # One row per physical block
+        layers = rows["layers"]
+        rows = np.repeat(rows, layers)
+        starts = np.cumsum(layers) - layers
+        rows["y"] -= (np.arange(len(rows)) - np.repeat(starts, layers)).astype(np.int16)
+        rows["layers"] = 1
+        return rows
+
+    def concat(self, other):
+        rows = other.rows
+        if other.guids is not self.guids and len(rows):
+            remap = np.array([self.block_id(g) for g in other.guids], dtype=np.uint16)
+            rows = rows.copy()
+            rows["block"] = remap[rows["block"]]
+        return self.with_rows(np.concatenate([self.rows, rows]))
+
+    @staticmethod
+    def cells(rows):
+        # (x, z) of every cell the rows cover; stern pieces run towards -z from their anchor
+        lens = rows["len"].astype(np.int64)
+        step = np.where(rows["is_stern"], -1, 1)
+        i = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+        xs = np.repeat(rows["x"].astype(np.int64), lens)
+        zs = np.repeat(rows["z"].astype(np.int64), lens) + np.repeat(step, lens) * i
+        return xs, zs
+
+
+class OccupancyGrid:
+    """Occupied (x, z) cells of one deck layer as a dense boolean array.
+
+    Only x >= 0 is stored. The hull is symmetric, so a lookup at -x reads x.
+    """
+
+    def __init__(self, max_x, min_z, max_z):
+        self.min_z = min_z
+        self.cells = np.zeros((max_x + 2, max_z - min_z + 1), dtype=bool)
+
+    @classmethod
+    def around(cls, rows, margin):
+        # Grid over the cells of rows, with margin spare stations past both ends
+        if not len(rows): return cls(0, 0, 0)
+        xs, zs = PlacementTable.cells(rows)
+        return cls(int(xs.max()), int(zs.min()) - margin, int(zs.max()) + margin)
+
+    def mark(self, xs, zs):
+        self.cells[xs, np.asarray(zs, dtype=np.int64) - self.min_z] = True
+
+    def occupied(self, xs, zs):
+        return self.cells[np.abs(xs), np.asarray(zs, dtype=np.int64) - self.min_z]
+
+    def walk(self, x, z, direction, limit):
+        # Cells a run starting at (x, z) fills when stepping along z: it stops before
+        # an occupied cell, or after the first cell beside an occupied one.
+        zi = z - self.min_z
+        idx = np.arange(zi, zi + direction * limit, direction)
+        blocked = self.cells[x, idx]
+        beside = self.cells[abs(x - 1), idx] | self.cells[x + 1, idx]
+        stop = blocked.argmax() if blocked.any() else limit
+        if beside[:stop].any(): stop = beside[:stop].argmax() + 1
+        return stop
+
+
+class SolveCache:
+    """Finished placements on disk, keyed by a hash of everything that shapes the hull."""
+
+    def __init__(self, directory=SOLVE_CACHE_DIR, max_bytes=SOLVE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(profile, material, height, undercut, do_floor, solver_mode, trial_budget, undercut_mode):
+        data = json.dumps([GENERATOR_VERSION, [int(x) for x in profile], material, int(height),
+                           int(undercut), bool(do_floor), solver_mode, int(trial_budget), undercut_mode])
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def guidmap_mtime():
+        mtimes = [os.path.getmtime(os.path.join(BASE_DIR, f)) for f in GUIDMAP_FILES if os.path.exists(os.path.join(BASE_DIR, f))]
+        return max(mtimes) if mtimes else 0.0
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        path = self.path_for(key)
+        if not os.path.exists(path): return None
+        try:
+            with np.load(path) as data:
+                if float(data["guidmap_mtime"]) != self.guidmap_mtime():
+                    entry = None
+                else:
+                    entry = PlacementTable(data["guids"].tolist(), data["rows"])
+        except FileNotFoundError:
+            return None # Evicted by another process since the exists() check
+        except Exception as e:
+            print(f"Failed to read solve cache entry: {e}")
+            entry = None
+        if entry is None:
+            # Written against an older guidmap (or unreadable); drop it.
+            try: os.remove(path)
+            except OSError: pass
+            return None
+        try: os.utime(path) # Mark as recently used
+        except OSError: pass # Evicted by another process meanwhile; the loaded entry is still good
+        return entry
+
+    def put(self, key, placements):
+        tmp_path = self.path_for(key) + f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez(f,
+                         guidmap_mtime=np.float64(self.guidmap_mtime()),
+                         guids=np.array(placements.guids, dtype=str),
+                         rows=placements.rows)
+            os.replace(tmp_path, self.path_for(key))
+        except Exception as e:
+            print(f"Failed to write solve cache entry: {e}")
+            try: os.remove(tmp_path)
+            except OSError: pass
+            return
+        self.evict()
+
+    def evict(self):
+        # Least recently used entries go first (get() refreshes the mtime).
+        # Batch workers share the directory, so a file may vanish under us;
+        # that counts as already evicted.
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.npz")):
+            try: st = os.stat(path)
+            except OSError: continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: pass
+            total -= size
+
+
+class BlockIndex:
+    """Guidmap names tokenized into (material, family, (length, to_length), hand) keys.
+
+        "Alloy 1m to 2m slope transition left" -> ("alloy", "slope transition", (1, 2), "left")
+        "Alloy inverted (R 3m)"                -> ("alloy", "inverted", (3, 3), "right")
+        "Alloy beam slope (2m mirrored)"       -> ("alloy", "beam slope", (2, 2), "mirrored")
+        "Metal block", "Heavy armour"          -> (material, "block", (1, 1), "")
+
+    Materials are the prefixes of the "<material> beam (Nm)" names. Names are
+    indexed in sorted order and the first one wins, so a duplicate key always
+    resolves to the same GUID.
+    """
+
+    def __init__(self, entries=()):
+        self.guids = {}
+        self.sizes_by_family = {}
+        for material, family, length, to_length, hand, guid in entries:
+            key = (material, family, (length, to_length), hand)
+            if key in self.guids: continue
+            self.guids[key] = guid
+            if length == to_length:
+                self.sizes_by_family.setdefault((material, family, hand), {})[length] = guid
+
+    @classmethod
+    def from_guidmap(cls, guidmap):
+        materials = {m.group(1).lower() for m in (re.match(r"^(.+) beam \(\d+m\)$", name, re.I) for name in guidmap) if m}
+        materials = sorted(materials, key=len, reverse=True) # Longest prefix first
+        entries = []
+        for name in sorted(guidmap):
+            tokens = cls.tokenize(name, materials)
+            if tokens: entries.append(tokens + (guidmap[name],))
+        return cls(entries)
+
+    @staticmethod
+    def tokenize(name, materials):
+        name = name.lower()
+        name = BLOCK_NAME_ALIASES.get(name, name)
+        material = next((m for m in materials if name == m or name.startswith(m + " ")), None)
+        if material is None: return None
+        lengths = []
+        family = []
+        hand = ""
+        for token in re.split(r"[\s()]+", name[len(material):]):
+            if not token or token == "to": continue
+            if re.fullmatch(r"\d+m", token): lengths.append(int(token[:-1]))
+            elif token in ("l", "left"): hand = "left"
+            elif token in ("r", "right"): hand = "right"
+            elif token == "mirrored": hand = "mirrored"
+            else: family.append(token)
+        if not lengths: lengths = [1]
+        # A bare material name ("Heavy armour") is that material's block
+        return material, " ".join(family) or "block", lengths[0], lengths[-1], hand
+
+    def entries(self):
+        return [[material, family, length, to_length, hand, guid]
+                for (material, family, (length, to_length), hand), guid in self.guids.items()]
+
+    def get(self, material, family, length, hand="", to_length=None):
+        return self.guids.get((material, family, (length, to_length or length), hand))
+
+    def sizes(self, material, family, hand=""):
+        # {length: guid} of a family's single-length blocks
+        return self.sizes_by_family.get((material, family, hand), {})
+
+
+class MaterialCatalog:
+    """Block GUIDs of every material, from a BlockIndex built once per process.
+
+    The index is kept in MATERIAL_CACHE_FILE so a fresh process skips parsing the
+    guidmap until it or GENERATOR_VERSION changes. The per-material tables are shared by all
+    generators: read only.
+    """
+
+    def __init__(self, path=MATERIAL_CACHE_FILE):
+        self.path = path
+        self.guidmap_mtime = SolveCache.guidmap_mtime()
+        self.index = self.load_cached()
+        if self.index is None:
+            self.index = BlockIndex.from_guidmap(self.read_guidmap())
+            self.save()
+        self.materials = {material: self.classify(material) for material in MATERIALS}
+
+    def get(self, material):
+        if material not in self.materials: self.materials[material] = self.classify(material)
+        return self.materials[material]
+
+    def load_cached(self):
+        if not os.path.exists(self.path): return None
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            # Built by another version's parser, or from an older guidmap: rebuild
+            if data.get("version") != GENERATOR_VERSION or data["guidmap_mtime"] != self.guidmap_mtime: return None
+            return BlockIndex(data["blocks"])
+        except Exception as e:
+            print(f"Failed to read material cache: {e}")
+            return None
 
-        target_mat = self.material.lower() # alloy, metal, wood, heavy, stone
+    def save(self):
+        tmp_path = self.path + f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": GENERATOR_VERSION, "guidmap_mtime": self.guidmap_mtime, "blocks": self.index.entries()}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to write material cache: {e}")
+            try: os.remove(tmp_path)
+            except OSError: pass
 
+    def read_guidmap(self):
         # Load from both JSON files in the BASE_DIR
         loaded_data = {}
         for fname in GUIDMAP_FILES:
@@ -419,459 +795,1343 @@ class BlueprintGenerator:
                         loaded_data.update(data)
                 except Exception as e:
                     print(f"Error loading {fname}: {e}")
+        return loaded_data
+
+    def classify(self, material):
+        name = BLOCK_MATERIAL_NAMES.get(material, material.lower())
+        beam_guids = dict(self.index.sizes(name, "beam"))
+        block = self.index.get(name, "block", 1)
+        if block: beam_guids[1] = block
+        slope_guids = dict(self.index.sizes(name, "slope"))
+
+        left = self.index.sizes(name, "offset", "left")
+        right = self.index.sizes(name, "offset", "right")
+        offset_guids = {length: {"left": left.get(length), "right": right.get(length)}
+                        for length in sorted(set(left) | set(right))}
+
+        # Port twin of a starboard offset is the other hand of the same length
+        mirror_guids = {}
+        for pair in offset_guids.values():
+            if pair["left"] and pair["right"]:
+                mirror_guids[pair["left"]] = pair["right"]
+                mirror_guids[pair["right"]] = pair["left"]
+        return {"beam": beam_guids, "slope": slope_guids, "offset": offset_guids, "mirror": mirror_guids}
+
+
+# Built on first use and rebuilt only if the guidmap changes on disk.
+_material_catalog = None
+
+def get_material_catalog():
+    global _material_catalog
+    if _material_catalog is None or _material_catalog.guidmap_mtime != SolveCache.guidmap_mtime():
+        _material_catalog = MaterialCatalog()
+    return _material_catalog
+
+
+def ascii_ints(values):
+    # Decimal text of each value as a right-aligned row of ASCII codes. Unused
+    # columns hold 0, so rows of different lengths are joined by dropping zeros.
+    # Values repeat a lot, so each distinct value in the range is formatted once.
+    values = np.asarray(values, dtype=np.int64)
+    if not len(values): return np.zeros((0, 1), dtype=np.uint8)
+    lo, hi = int(values.min()), int(values.max())
+    width = max(len(str(lo)), len(str(hi)))
+    text = np.arange(lo, hi + 1)
+    magnitude = np.abs(text)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    n_digits = np.maximum(1, (magnitude[:, None] >= powers[None, :]).sum(axis=1))
+    column = np.arange(width)[None, :]
+    first_digit = width - n_digits[:, None]
+    table = np.where(column >= first_digit, (magnitude[:, None] // powers) % 10 + ord("0"), 0).astype(np.uint8)
+    table[(column == first_digit - 1) & (text[:, None] < 0)] = ord("-")
+    return table[values - lo]
+
+
+def join_rows(*columns, separator=b", "):
+    # Concatenates the rows of the ASCII matrices/bytes side by side and joins the
+    # rows with separator; zero bytes are padding and vanish.
+    n = len(next(c for c in columns if not isinstance(c, bytes)))
+    parts = [np.tile(np.frombuffer(c, dtype=np.uint8), (n, 1)) if isinstance(c, bytes) else c for c in columns]
+    parts.append(np.tile(np.frombuffer(separator, dtype=np.uint8), (n, 1)))
+    text = np.concatenate(parts, axis=1).ravel()
+    return text[text != 0].tobytes()[:-len(separator)]
+
+
+class DonorTemplate:
+    """donor.blueprint rendered once, around the fields every export fills in.
+
+    The document is stored as byte segments with a named gap between each pair;
+    write() fills the gaps from a dict of bytes or callables that write to the
+    file themselves (the streamed block arrays).
+    """
+
+    TOP_FIELDS = ["SavedTotalBlockCount", "ItemDictionary"]
+    BLUEPRINT_FIELDS = ["BLP", "BLR", "BCI", "BlockIds", "BlockState", "TotalBlockCount", "AliveCount",
+                        "BlockCount", "MinCords", "MaxCords"]
+
+    def __init__(self, path=DONOR_BLUEPRINT):
+        self.mtime = os.path.getmtime(path)
+        with open(path, "r") as f: bp = json.load(f)
 
-        for name, guid in loaded_data.items():
-            name_lower = name.lower()
+        bp["Blueprint"]["SCs"] = []; bp["Blueprint"]["BP1"] = None; bp["Blueprint"]["BP2"] = None
+        self.items = dict(bp.get("ItemDictionary", {})) # Donor entries stay in every export
+        for key in self.TOP_FIELDS: bp[key] = f"@@{key}@@"
+        for key in self.BLUEPRINT_FIELDS: bp["Blueprint"][key] = f"@@{key}@@"
+
+        pieces = re.split(r'"@@(\w+)@@"', json.dumps(bp))
+        self.segments = [piece.encode("utf-8") for piece in pieces[0::2]]
+        self.fields = pieces[1::2]
+
+    def write(self, f, values):
+        for segment, field in zip(self.segments, self.fields):
+            f.write(segment)
+            value = values[field]
+            if callable(value): value(f)
+            else: f.write(value)
+        f.write(self.segments[-1])
+
+
+# Parsed on first use and again only if donor.blueprint changes on disk.
+_donor_template = None
+
+def get_donor_template():
+    global _donor_template
+    if _donor_template is None or _donor_template.mtime != os.path.getmtime(DONOR_BLUEPRINT):
+        _donor_template = DonorTemplate()
+    return _donor_template
+
+
+# Worker processes are expensive to start (each one re-imports this script), so the
+# pool is created on first use and kept for the rest of the session.
+_solver_pool = None
+_solver_pool_workers = 0
+
+def get_solver_pool(workers):
+    global _solver_pool, _solver_pool_workers
+    if _solver_pool is None or _solver_pool_workers != workers:
+        if _solver_pool is not None:
+            _solver_pool.shutdown()
+        _solver_pool = ProcessPoolExecutor(max_workers=workers)
+        _solver_pool_workers = workers
+    return _solver_pool
+
+
+class StepLog:
+    """Steps walked by one solver trial, as stations counted from the bow.
+
+    A step may stand for count identical blocks laid end to end (a run of the
+    longest beam through a constant-width stretch); last holds the station of
+    the final block, which is the furthest the step's decisions depend on.
+    """
+
+    def __init__(self):
+        self.z = []
+        self.prev = []
+        self.limited = []
+        self.choice = []
+        self.cost = []
+        self.count = []
+        self.last = []
+        self.cum = [0]  # Finite cost before each step
+        self.infs = [0] # Fallback (infinite cost) steps before each step
+
+    def __len__(self):
+        return len(self.z)
+
+    def append(self, z, prev, limited, choice, cost, count=1):
+        self.z.append(z)
+        self.prev.append(prev)
+        self.limited.append(limited)
+        self.choice.append(choice)
+        self.cost.append(cost)
+        self.count.append(count)
+        self.last.append(z + (count - 1) * choice["len"] if choice else z)
+        if cost == float('inf'):
+            self.cum.append(self.cum[-1])
+            self.infs.append(self.infs[-1] + 1)
+        else:
+            self.cum.append(self.cum[-1] + cost)
+            self.infs.append(self.infs[-1])
 
-            # --- 1m Block Logic (from standard blocks in guidmap-blocks.json) ---
-            # These usually do NOT have "1m" in the name in the json file provided
-            is_1m = False
-            
-            if target_mat == "alloy":
-                if "light-weight alloy block" in name_lower: is_1m = True
-            elif target_mat == "heavy":
-                if name_lower == "heavy armour": is_1m = True
+    def span_cost(self, lo, hi):
+        if self.infs[hi] > self.infs[lo]: return float('inf')
+        return self.cum[hi] - self.cum[lo]
+
+
+class HullSolver:
+    """Chooses the beam/slope sequence for the side wall along the hull profile.
+
+    Everything is worked out in stations counted from the bow; the stern-relative
+    blueprint z is only applied in place(). That lets one solver follow a profile
+    across designer edits (see update_profile()). Only the starboard wall is
+    placed; the port wall is its mirror image.
+    """
+
+    def __init__(self, profile, slope_guids, beam_guids):
+        self.profile = profile
+        self.slope_guids = slope_guids
+        self.beam_guids = beam_guids
+        self.candidates = None
+        self.trial_paths = {} # forced_1m_zone -> path of the last in-process sweep
+        self.dirty_from = None # First station whose decisions changed since that sweep
+
+    def __getstate__(self):
+        # Trial paths only matter to the in-process sweep; keep them out of worker pickles.
+        state = self.__dict__.copy()
+        state["trial_paths"] = {}
+        return state
+
+    def build_candidates(self, limit_len=99):
+        all_lengths = sorted(set(self.slope_guids) | set(self.beam_guids), reverse=True)
+        candidates = []
+        for l in all_lengths:
+            if l > limit_len: continue
+            if l in self.slope_guids:
+                candidates.append({"type": "slope", "len": l, "offset": -1, "is_stern": False, "guid": self.slope_guids[l]})
+                candidates.append({"type": "slope", "len": l, "offset": 1, "is_stern": True, "guid": self.slope_guids[l]})
+            if l in self.beam_guids:
+                candidates.append({"type": "beam", "len": l, "offset": 0, "is_stern": False, "guid": self.beam_guids[l]})
+        return candidates
+
+    def build_fit_table(self, start=0):
+        # (station, candidate) cost of everything that does not depend on the previous
+        # block: fit error and the flat efficiency cost. Candidates that run past the
+        # stern, miss the profile by more than 1m or fail the 1.5x lookahead are
+        # marked infeasible. Only rows from start onwards are built.
+        profile = np.asarray(self.profile, dtype=np.int64)
+        L = len(profile)
+        cand_len = np.array([c["len"] for c in self.candidates], dtype=np.int64)
+        cand_offset = np.array([c["offset"] for c in self.candidates], dtype=np.int64)
+        if start >= L:
+            empty = np.zeros((0, len(self.candidates)), dtype=np.int64)
+            return empty, empty.astype(bool)
+
+        z = np.arange(start, L)[:, None]
+        end = z + cand_len[None, :]
+        dist_current = profile[start:, None]
+
+        target_x = profile[np.minimum(end, L - 1)]
+        dist_ideal = dist_current - cand_offset[None, :]
+        error = np.abs(target_x - dist_ideal)
+        feasible = (end <= L) & (error <= 1.0)
+
+        lookahead_step = np.array([int(l * 1.5) for l in cand_len], dtype=np.int64)
+        lookahead_z = z + lookahead_step[None, :]
+        ratio = lookahead_step / cand_len
+        future_x = profile[np.minimum(lookahead_z, L - 1)]
+        dist_fut_ideal = dist_current - (cand_offset * ratio)[None, :]
+        checked = (cand_len[None, :] > 1) & (lookahead_z < L)
+        feasible &= ~(checked & (np.abs(future_x - dist_fut_ideal) > 1.0))
+
+        fit_penalty = error * 50
+        efficiency_cost = 10
+        return efficiency_cost + fit_penalty, feasible
+
+    @staticmethod
+    def length_penalty(b_len, current_min_len):
+        return (current_min_len - b_len) * 10 if b_len < current_min_len else -(b_len * 2)
+
+    @staticmethod
+    def empty_stats():
+        return {"trials": 0, "trials_pruned": 0, "stations_skipped": 0, "trials_resumed": 0}
+
+    def prepare(self):
+        # Scores every candidate at every station up front so the trials only do
+        # table lookups. best_index[limited][prev][z] is the candidate simulate()
+        # would pick at z after a block of length prev_lengths[prev] (-1: none fits).
+        self.candidates = self.build_candidates()
+        self.prev_lengths = sorted(set(c["len"] for c in self.candidates) | {1})
+        self.prev_index = {l: i for i, l in enumerate(self.prev_lengths)}
+        cand_len = [c["len"] for c in self.candidates]
+        self.len_table = np.array([[self.length_penalty(l, p) for l in cand_len] for p in self.prev_lengths], dtype=np.int64)
+        self.bow_mask = np.array([l <= 1 for l in cand_len], dtype=bool)
+        # How many stations past z a decision at z can read (fallback reads z + 1).
+        self.reach = max([1] + [max(l, int(l * 1.5)) for l in cand_len])
+
+        P = len(self.prev_lengths)
+        self.fit_table = np.zeros((0, len(self.candidates)), dtype=np.int64)
+        self.feasible = np.zeros((0, len(self.candidates)), dtype=bool)
+        self.best_index = np.zeros((2, P, 0), dtype=np.int64)
+        self.best_cost = np.zeros((2, P, 0), dtype=np.int64)
+        self.best_lookup = [[[] for _ in range(P)] for _ in range(2)]
+        self.best_cost_lookup = [[[] for _ in range(P)] for _ in range(2)]
+        self.trial_paths = {}
+        self.dirty_from = None
+        self.update_tables(0)
+
+    def update_tables(self, start):
+        # Rebuilds the table rows from station start onwards for the current profile.
+        fit, feasible = self.build_fit_table(start)
+        self.fit_table = np.concatenate([self.fit_table[:start], fit])
+        self.feasible = np.concatenate([self.feasible[:start], feasible])
+
+        n = len(fit)
+        P = len(self.prev_lengths)
+        best_index = np.full((2, P, n), -1, dtype=np.int64)
+        best_cost = np.zeros((2, P, n), dtype=np.int64)
+        if n and self.candidates:
+            for limited, allowed in enumerate([np.ones_like(self.bow_mask), self.bow_mask]):
+                usable = feasible & allowed[None, :]
+                for p in range(P):
+                    total = self.len_table[p][None, :] + fit
+                    masked = np.where(usable, total, np.iinfo(np.int64).max)
+                    idx = np.argmin(masked, axis=1)
+                    found = usable[np.arange(n), idx]
+                    best_index[limited, p] = np.where(found, idx, -1)
+                    best_cost[limited, p] = np.where(found, total[np.arange(n), idx], 0)
+        self.best_index = np.concatenate([self.best_index[:, :, :start], best_index], axis=2)
+        self.best_cost = np.concatenate([self.best_cost[:, :, :start], best_cost], axis=2)
+        for limited in range(2):
+            for p in range(P):
+                self.best_lookup[limited][p][start:] = best_index[limited, p].tolist()
+                self.best_cost_lookup[limited][p][start:] = best_cost[limited, p].tolist()
+
+        self.run_lookup = self.build_run_table().tolist()
+
+        # Cheapest cost per metre of any block (a skipped station costs 200), used as
+        # an admissible bound on the rest of a trial.
+        self.min_station_cost = 200
+        if self.feasible.any():
+            cand_len = np.array([c["len"] for c in self.candidates], dtype=np.int64)
+            per_station = (self.fit_table + self.len_table.min(axis=0)[None, :]) / cand_len[None, :]
+            self.min_station_cost = min(self.min_station_cost, float(per_station[self.feasible].min()))
+
+    def segment_profile(self):
+        # Splits the profile into (start, end, constant) runs: stretches of one width
+        # (parallel mid-body) and the tapered stretches between them.
+        profile = np.asarray(self.profile)
+        L = len(profile)
+        if L == 0: return []
+        breaks = np.nonzero(profile[1:] != profile[:-1])[0] + 1
+        bounds = [0] + breaks.tolist() + [L]
+        return [(s, e, e - s > 1) for s, e in zip(bounds[:-1], bounds[1:])]
+
+    def build_run_table(self):
+        # run_steps[z]: how many of the longest beam a trial lays back to back from z,
+        # once it is already laying that beam. Inside a constant run (with reach to
+        # spare) that beam fits exactly and beats every other candidate, so trials
+        # jump the whole stretch in one step. Only stations where the lookup table
+        # agrees are counted, so the jump never differs from walking it.
+        L = len(self.profile)
+        run_steps = np.zeros(L, dtype=np.int64)
+        self.fill_len = max(self.beam_guids) if self.beam_guids else None
+        if not L or self.fill_len not in self.prev_index: return run_steps
+        fill_index = next(i for i, c in enumerate(self.candidates) if c["type"] == "beam" and c["len"] == self.fill_len)
+
+        flat = np.zeros(L, dtype=bool)
+        for start, end, constant in self.segment_profile():
+            if constant and end - start > self.reach:
+                flat[start:end - self.reach] = True
+        chosen = self.best_index[0, self.prev_index[self.fill_len]] == fill_index
+        fits = flat & chosen
+
+        m = self.fill_len
+        for r in range(m):
+            lane = fits[r::m]
+            n = len(lane)
+            idx = np.arange(n)
+            next_gap = np.where(lane, n, idx)
+            next_gap = np.minimum.accumulate(next_gap[::-1])[::-1]
+            run_steps[r::m] = next_gap - idx
+        return run_steps
+
+    def update_profile(self, profile, slope_guids, beam_guids):
+        # Moves the solver onto an edited profile. Designer edits only change the
+        # profile from some station on, so the tables and the trial paths of the last
+        # sweep are kept for every station the edit cannot reach.
+        if self.candidates is None or slope_guids != self.slope_guids or beam_guids != self.beam_guids:
+            self.profile = profile
+            self.slope_guids = slope_guids
+            self.beam_guids = beam_guids
+            self.candidates = None
+            self.trial_paths = {}
+            self.dirty_from = None
+            return
+
+        old = np.asarray(self.profile)
+        new = np.asarray(profile)
+        n = min(len(old), len(new))
+        changed = np.nonzero(old[:n] != new[:n])[0]
+        first_change = int(changed[0]) if len(changed) else n
+        self.profile = profile
+        if first_change == len(old) == len(new): return
+
+        start = max(0, first_change - self.reach)
+        self.update_tables(start)
+        self.dirty_from = start if self.dirty_from is None else min(self.dirty_from, start)
+
+    def fallback_choice(self, current_z):
+        L = len(self.profile)
+        dist_current = self.profile[current_z]
+        best_choice = None
+        if 1 in self.slope_guids:
+            fb_cands = [
+                {"type": "slope", "len": 1, "offset": -1, "is_stern": False, "guid": self.slope_guids[1]},
+                {"type": "slope", "len": 1, "offset": 1, "is_stern": True, "guid": self.slope_guids[1]},
+                {"type": "beam", "len": 1, "offset": 0, "is_stern": False, "guid": self.beam_guids.get(1)}
+            ]
+            best_err = float('inf')
+            for c in fb_cands:
+                if not c["guid"]: continue
+                if current_z + c["len"] > L: continue
+                tx = self.profile[current_z+1] if current_z+1 < L else self.profile[-1]
+                di = dist_current - c["offset"]
+                if abs(tx - di) < best_err: best_err = abs(tx - di); best_choice = c
+        return best_choice
+
+    def place(self, choice, current_z):
+        L = len(self.profile)
+        dist_current = self.profile[current_z]
+        b_len = choice["len"]
+
+        z_shift = 1 if choice["is_stern"] else b_len
+        placement_z = L - (current_z + z_shift)
+
+        gx_right = dist_current
+        rot_right = ROT_BEAM
+
+        if choice["type"] == "slope":
+            if choice["is_stern"]:
+                rot_right = ROT_RIGHT_STERN
             else:
-                # Wood, Metal, Stone follow "{Material} Block" pattern
-                if f"{target_mat} block" in name_lower: is_1m = True
+                if choice["offset"] == -1:
+                    rot_right = ROT_RIGHT_OUT; gx_right += 1
+                else:
+                    rot_right = ROT_RIGHT_IN
+
+        # Mirrored even on the centerline: a zero-width station still gets both walls.
+        return {'pos': (gx_right, 10, placement_z), 'rot': rot_right, 'guid': choice["guid"], 'props': choice, 'mirror': True}
+
+    def run_trial(self, forced_1m_zone, memo, bound=None, start=None):
+        # Walks the lookup tables from the bow, or from start = (path so far, station,
+        # previous length) when resuming an earlier trial. A path is a list of
+        # (StepLog, lo, hi) spans. Past the forced zone the rest of the walk depends
+        # only on (station, previous length), so the trial stops at the first state an
+        # earlier trial in the same memo already finished, and records its own states
+        # for later trials. memo maps a state to
+        # (suffix cost, StepLog, index, path after that StepLog).
+        # With a bound, the trial is abandoned once it can no longer score below it; it
+        # then returns an infinite score and the number of stations it did not walk.
+        if self.candidates is None: self.prepare()
+        L = len(self.profile)
+        if start: prefix, current_z, current_min_len = start
+        else: prefix, current_z, current_min_len = [], 0, 1
+        total_penalty = sum(log.span_cost(lo, hi) for log, lo, hi in prefix)
+        log = StepLog()
+        tail = []
 
-            if is_1m:
-                self.beam_guids[1] = guid
+        while current_z < L:
+            limited = 1 if current_z < forced_1m_zone else 0
+            if not limited and (current_z, current_min_len) in memo:
+                suffix_cost, owner, index, owner_tail = memo[(current_z, current_min_len)]
+                total_penalty += suffix_cost
+                tail = [(owner, index, len(owner))] + owner_tail
+                break
+            if bound is not None and total_penalty + self.min_station_cost * (L - current_z) >= bound:
+                return float('inf'), prefix + [(log, 0, len(log))], L - current_z
+
+            prev = self.prev_index[current_min_len]
+            state = (current_z, current_min_len, limited)
+
+            if not limited and current_min_len == self.fill_len and self.run_lookup[current_z] > 1:
+                count = self.run_lookup[current_z]
+                run_cost = self.best_cost_lookup[0][prev][current_z] * count
+                best_choice = self.candidates[self.best_lookup[0][prev][current_z]]
+                total_penalty += run_cost
+                log.append(*state, best_choice, run_cost, count)
+                current_z += best_choice["len"] * count
                 continue
 
-            # --- 2m, 3m, 4m and Slope/Corner Logic ---
-            # Filter for material presence in name
-            check_str = "heavy armour" if target_mat == "heavy" else target_mat
-            if check_str not in name_lower: continue
+            idx = self.best_lookup[limited][prev][current_z]
 
-            length = 0
-            if "4m" in name_lower: length = 4
-            elif "3m" in name_lower: length = 3
-            elif "2m" in name_lower: length = 2
-            elif "1m" in name_lower: length = 1 # Handle explicit "1m" in slopes/corners
+            if idx < 0:
+                current_min_len = 1
+                best_choice = self.fallback_choice(current_z)
+                if not best_choice:
+                    total_penalty += 200
+                    log.append(*state, None, 200)
+                    current_z += 1
+                    continue
+                min_step_cost = float('inf') # A fallback step disqualifies the trial, as in the original greedy pass
+            else:
+                best_choice = self.candidates[idx]
+                min_step_cost = self.best_cost_lookup[limited][prev][current_z]
 
-            if length == 0: continue 
+            total_penalty += min_step_cost
+            log.append(*state, best_choice, min_step_cost)
+            current_min_len = best_choice["len"]
+            current_z += best_choice["len"]
+
+        suffix_cost = memo[(current_z, current_min_len)][0] if tail else 0
+        for i in range(len(log) - 1, -1, -1):
+            if log.limited[i]: break
+            suffix_cost = log.cost[i] + suffix_cost
+            memo[(log.z[i], log.prev[i])] = (suffix_cost, log, i, tail)
+        return total_penalty, prefix + [(log, 0, len(log))] + tail, 0
+
+    @staticmethod
+    def resume_state(path, from_z):
+        # Splits a stored path before its first step at or after station from_z and
+        # returns (prefix, station, previous length) to hand back to run_trial().
+        prefix = []
+        for log, lo, hi in path:
+            i = bisect.bisect_left(log.last, from_z, lo, hi)
+            if i > lo: prefix.append((log, lo, i))
+            if i < hi: return prefix, log.z[i], log.prev[i]
+        # Every step lies before from_z: carry on from where the path stops.
+        for log, lo, hi in reversed(prefix):
+            choice = log.choice[hi - 1]
+            if choice: return prefix, log.last[hi - 1] + choice["len"], choice["len"]
+            return prefix, log.z[hi - 1] + 1, 1
+        return prefix, 0, 1
+
+    def materialize(self, path):
+        placements = []
+        for log, lo, hi in path:
+            for i in range(lo, hi):
+                choice = log.choice[i]
+                if not choice: continue
+                for j in range(log.count[i]):
+                    placements.append(self.place(choice, log.z[i] + j * choice["len"]))
+        return placements
+
+    def simulate(self, forced_1m_zone):
+        score, path, _ = self.run_trial(forced_1m_zone, {})
+        return score, self.materialize(path)
+
+    def sweep_zones(self, zones, reuse=False):
+        # Best trial of zones (earliest wins ties), sharing one suffix memo. Trials
+        # that cannot beat the best so far are cut short. With reuse, each trial
+        # resumes its path from the last sweep at the first station an edit reached.
+        memo = {}
+        best = None
+        best_run_score = float('inf')
+        stats = self.empty_stats()
+        resume_from = len(self.profile) if self.dirty_from is None else self.dirty_from
+        paths = {}
+        for forced_1m_zone in zones:
+            start = None
+            if reuse and forced_1m_zone in self.trial_paths:
+                start = self.resume_state(self.trial_paths[forced_1m_zone], resume_from)
+                stats["trials_resumed"] += 1
+            score, path, skipped = self.run_trial(forced_1m_zone, memo, best_run_score, start)
+            paths[forced_1m_zone] = path
+            stats["trials"] += 1
+            if skipped:
+                stats["trials_pruned"] += 1
+                stats["stations_skipped"] += skipped
+            if score < best_run_score:
+                best_run_score = score
+                best = path
+        if reuse:
+            self.trial_paths = paths
+            self.dirty_from = None
+        if best is None:
+            return best_run_score, [], stats
+        return best_run_score, self.materialize(best), stats
+
+    def sweep(self, zones=None, workers=1):
+        if self.candidates is None: self.prepare()
+        if zones is None:
+            # Every zone at or past the stern forces 1m blocks over the whole hull,
+            # so only the first of them can win.
+            zones = range(0, min(25, len(self.profile) + 1))
+        zones = list(zones)
+        best_placements = []
+        best_run_score = float('inf')
+        stats = self.empty_stats()
+        if workers > 1:
+            # Each worker sweeps a contiguous block of zones with its own memo; blocks
+            # come back in zone order, so the reduction below picks the same winner
+            # as the single-process sweep. Trial paths stay in-process only.
+            size = -(-len(zones) // workers)
+            chunks = [zones[i:i + size] for i in range(0, len(zones), size)]
+            trials = get_solver_pool(workers).map(self.sweep_zones, chunks)
+            self.trial_paths = {}
+            self.dirty_from = None
+        else:
+            trials = [self.sweep_zones(zones, reuse=True)]
+        for score, result, chunk_stats in trials:
+            for key in stats: stats[key] += chunk_stats[key]
+            if score < best_run_score:
+                best_run_score = score
+                best_placements = result
+        return best_run_score, best_placements, stats
+
+    def solve_anytime(self, time_budget, zones=None, on_progress=None):
+        # Synchronous, best-effort budget: tries zones in order until time_budget
+        # seconds have passed or every zone has been tried, then returns the best
+        # layout. The deadline is only checked between trials and the first trial
+        # always runs, so a call can overrun by one trial (plus prepare() the first
+        # time). on_progress(best score, stats so far) is called whenever the best
+        # layout improves. If no trial is feasible the fallback layout
+        # (simulate(1)) is returned.
+        deadline = time.perf_counter() + time_budget
+        if self.candidates is None: self.prepare()
+        if zones is None: zones = range(0, min(25, len(self.profile) + 1))
+        zones = list(zones)
+        memo = {}
+        best = None
+        best_run_score = float('inf')
+        stats = self.empty_stats()
+        for forced_1m_zone in zones:
+            if stats["trials"] and time.perf_counter() >= deadline: break
+            score, path, skipped = self.run_trial(forced_1m_zone, memo, best_run_score)
+            stats["trials"] += 1
+            if skipped:
+                stats["trials_pruned"] += 1
+                stats["stations_skipped"] += skipped
+            if score < best_run_score:
+                best_run_score = score
+                best = path
+                if on_progress: on_progress(best_run_score, dict(stats))
+        stats["complete"] = stats["trials"] == len(zones)
+        if best is None:
+            score, placements = self.simulate(1)
+            return score, placements, stats
+        return best_run_score, self.materialize(best), stats
+
+    def bow_zone_seeds(self, count):
+        # Initial forced_1m_zone guesses, spread over the bow taper (bow tip to the
+        # first widest station) with more of them where the width grows fastest.
+        profile = np.asarray(self.profile, dtype=np.int64)
+        if len(profile) == 0 or count <= 1: return [0]
+        taper_end = int(np.argmax(profile))
+        if taper_end == 0: return [0]
+        growth = np.abs(np.diff(profile[:taper_end + 1])) + 0.1
+        cdf = np.cumsum(growth) / growth.sum()
+        quantiles = np.linspace(0, 1, count)[1:]
+        seeds = np.searchsorted(cdf, quantiles) + 1
+        return sorted(set([0] + [int(s) for s in seeds]))
+
+    def search_zones(self, budget=12):
+        # Length-adaptive alternative to sweep(): seeds zones from the bow taper, then
+        # bisects the gaps on both sides of the best zone until the gaps close or the
+        # trial budget runs out. Ties go to the smaller zone, as in sweep().
+        if self.candidates is None: self.prepare()
+        memo = {}
+        scores = {}
+        paths = {}
+        stats = self.empty_stats()
+
+        def best_zone():
+            return min(scores, key=lambda z: (scores[z], z))
+
+        def try_zone(zone):
+            bound = min(scores.values()) if scores else float('inf')
+            score, path, skipped = self.run_trial(zone, memo, bound)
+            stats["trials"] += 1
+            if skipped:
+                stats["trials_pruned"] += 1
+                stats["stations_skipped"] += skipped
+            scores[zone] = score
+            paths[zone] = path
+
+        for zone in self.bow_zone_seeds(max(2, budget // 2))[:budget]:
+            try_zone(zone)
+
+        while stats["trials"] < budget:
+            tried = sorted(scores)
+            best = best_zone()
+            i = tried.index(best)
+            gaps = []
+            if i > 0: gaps.append((tried[i - 1] + best) // 2)
+            if i + 1 < len(tried): gaps.append((best + tried[i + 1]) // 2)
+            gaps = [z for z in gaps if z not in scores]
+            if not gaps: break
+            for zone in gaps[:budget - stats["trials"]]:
+                try_zone(zone)
+
+        best = best_zone()
+        if scores[best] == float('inf'):
+            return float('inf'), [], stats
+        return scores[best], self.materialize(paths[best]), stats
+
+    def solve_optimal(self):
+        # Minimum-cost path over (station, previous block length) states, solved
+        # backwards from the stern. Uses the same step costs as simulate(), so the
+        # result never scores worse than any trial of the sweep.
+        if self.candidates is None: self.prepare()
+        L = len(self.profile)
+        if L == 0 or not self.candidates:
+            return float('inf'), []
+
+        cand_len = np.array([c["len"] for c in self.candidates], dtype=np.int64)
+        cand_prev = np.array([self.prev_index[l] for l in cand_len], dtype=np.int64)
+        fit = np.where(self.feasible, self.fit_table, np.inf)
+        rows = np.arange(len(self.prev_lengths))
+
+        cost_to_end = np.full((L + 1, len(self.prev_lengths)), np.inf)
+        cost_to_end[L] = 0
+        next_choice = np.zeros((L, len(self.prev_lengths)), dtype=np.int64)
+        for z in range(L - 1, -1, -1):
+            rest = cost_to_end[np.minimum(z + cand_len, L), cand_prev]
+            total = self.len_table + (fit[z] + rest)[None, :]
+            idx = np.argmin(total, axis=1)
+            cost_to_end[z] = total[rows, idx]
+            next_choice[z] = idx
+
+        start = self.prev_index[1]
+        if cost_to_end[0, start] == np.inf:
+            return float('inf'), []
+
+        placements = []
+        current_z = 0
+        current_min_len = 1
+        while current_z < L:
+            choice = self.candidates[next_choice[current_z, self.prev_index[current_min_len]]]
+            placements.append(self.place(choice, current_z))
+            current_min_len = choice["len"]
+            current_z += choice["len"]
+        return int(cost_to_end[0, start]), placements
 
-            # Categorize
-            # 1. Beams (Exclude slopes/corners)
-            if "beam" in name_lower and "slope" not in name_lower and "corner" not in name_lower:
-                self.beam_guids[length] = guid
-            
-            # 2. Slopes
-            elif "slope" in name_lower:
-                self.slope_guids[length] = guid
-            
-            # 3. Offsets/Corners
-            elif "offset" in name_lower and "inverted" not in name_lower:
-                if length not in self.offset_guids:
-                    self.offset_guids[length] = {"left": None, "right": None}
-                
-                if "left" in name_lower:
-                    self.offset_guids[length]["left"] = guid
-                elif "right" in name_lower:
-                    self.offset_guids[length]["right"] = guid
+
+class GeneratorError(Exception):
+    """An export that cannot run: missing block IDs, donor blueprint or profile."""
+
+
+def profile_from_points(points):
+    """Half-width at every metre from the bow, interpolated between (z, x) points."""
+    max_z = points[-1][0]
+    z_coords = [p[0] for p in points]
+    x_coords = [p[1] for p in points]
+    full_z = np.arange(max_z + 1)
+    full_x = np.interp(full_z, z_coords, x_coords)
+    return np.round(full_x).astype(int)
+
+
+class BlueprintGenerator:
+    def __init__(self, profile, center_offset, height, undercut, do_floor, save_path, material, solver_mode="sweep", workers=1, trial_budget=ADAPTIVE_TRIAL_BUDGET, use_cache=True, solver=None, undercut_mode="trace", out_file=None):
+        self.profile = profile
+        self.center_offset = center_offset
+        self.height = height
+        self.undercut = undercut
+        self.do_floor = do_floor
+        self.save_path = save_path
+        self.material = material
+        self.solver_mode = solver_mode # "sweep" (25 greedy trials), "adaptive" (bow-driven trials) or "optimal" (single DP pass)
+        self.workers = workers # Processes used by the sweep; 1 runs it in this process
+        self.trial_budget = trial_budget # Max trials for the adaptive search
+        self.use_cache = use_cache # Reuse finished placements from SOLVE_CACHE_DIR
+        self.solver = solver # HullSolver kept from an earlier export of the same design, if any
+        self.undercut_mode = undercut_mode # "trace" (each layer follows the one above) or "inset" (layers cut from the profile)
+        self.out_file = out_file # Exact output path; overrides save_path/OUTPUT_FILENAME
+        self.placements = PlacementTable()
+        self.report = None # Block counts and bounds of the last saved blueprint
+        self.timings = {} # Seconds spent in the solve, build and save stages of the last generate()
+
+        # Placement rows hold coordinates as int16 (and layer counts as uint16), so
+        # refuse hulls whose blocks would wrap around instead of writing them.
+        limit = int(np.iinfo(PLACEMENT_DTYPE["z"]).max)
+        if len(profile) + 1 >= limit or (len(profile) and int(np.max(profile)) + 1 >= limit):
+            raise GeneratorError(f"Hull is too big: length and half-width must stay under {limit - 1}m.")
+        if height + undercut + 1 >= limit:
+            raise GeneratorError(f"Hull is too tall: height plus undercut must stay under {limit - 1}m.")
+        
+        # Initialize empty dictionaries (No hardcoding!)
+        self.beam_guids = {}
+        self.slope_guids = {}
+        self.offset_guids = {} 
+        self.load_assets()
+
+
+    def load_assets(self):
+        # Shared with every other generator; never modified here
+        assets = get_material_catalog().get(self.material)
+        self.beam_guids = assets["beam"]
+        self.slope_guids = assets["slope"]
+        self.offset_guids = assets["offset"]
+        self.mirror_guids = assets["mirror"]
 
     def generate(self):
         # Check if we at least found the 1m block
         if 1 not in self.beam_guids:
-             messagebox.showerror("Error", f"Could not find 1m Block ID for '{self.material}' in JSON maps.\nEnsure guidmap.json is present and correct.")
-             return
-
-        best_placements = []
-        best_run_score = float('inf')
-        print("Starting Solver...")
-        
-        for forced_1m_zone in range(0, 25):
-            score, result = self.simulate_hull(forced_1m_zone)
-            if result is not None:
-                if score < best_run_score:
-                    best_run_score = score
-                    best_placements = result
+            raise GeneratorError(f"Could not find 1m Block ID for '{self.material}' in JSON maps.\nEnsure guidmap.json is present and correct.")
+
+        self.timings = {"solve": 0.0, "build": 0.0, "save": 0.0}
+        start = time.perf_counter()
+        cache = SolveCache() if self.use_cache else None
+        if cache:
+            cache_key = SolveCache.make_key(self.profile, self.material, self.height, self.undercut,
+                                            self.do_floor, self.solver_mode, self.trial_budget, self.undercut_mode)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print("Loaded hull from solve cache.")
+                self.placements = cached
+                self.timings["solve"] = time.perf_counter() - start
+                self.save_to_blueprint()
+                self.timings["save"] = time.perf_counter() - start - self.timings["solve"]
+                return
+
+        solver = self.prepare_solver()
+        if self.solver_mode == "optimal":
+            print("Starting Optimal Solver...")
+            best_run_score, best_placements = solver.solve_optimal()
+        else:
+            print("Starting Solver...")
+            if self.solver_mode == "adaptive":
+                best_run_score, best_placements, stats = solver.search_zones(self.trial_budget)
+            else:
+                best_run_score, best_placements, stats = solver.sweep(workers=self.workers)
+            print(f"Ran {stats['trials']} trials, pruned {stats['trials_pruned']} ({stats['stations_skipped']} stations skipped).")
         
         if best_placements:
             print(f"Optimal hull found. Score: {best_run_score}")
-            self.placements = best_placements
         else:
             print("Fallback used.")
-            _, self.placements = self.simulate_hull(1)
+            _, best_placements = solver.simulate(1)
+        self.placements = PlacementTable.from_placements(best_placements)
+        solved = time.perf_counter()
+        self.timings["solve"] = solved - start
         
         self.fill_stern()
         self.stack_layers()
-        self.generate_undercut()
+        if self.undercut_mode == "inset":
+            self.generate_inset_undercut()
+        else:
+            self.generate_undercut()
         
         if self.do_floor:
             self.generate_floor()
         
+        if cache: cache.put(cache_key, self.placements)
+        built = time.perf_counter()
+        self.timings["build"] = built - solved
         self.save_to_blueprint()
+        self.timings["save"] = time.perf_counter() - built
+
+    def prepare_solver(self):
+        if self.solver is None:
+            self.solver = HullSolver(self.profile, self.slope_guids, self.beam_guids)
+        else:
+            self.solver.update_profile(self.profile, self.slope_guids, self.beam_guids)
+        return self.solver
+
+    def estimate_wall_blocks(self, time_budget):
+        # Side wall blocks (all deck layers, stern row included) of the best layout
+        # the solver finds within time_budget seconds. Used for live previews; the
+        # table updates in prepare_solver() count against the budget too.
+        if 1 not in self.beam_guids or len(self.profile) == 0: return 0
+        start = time.perf_counter()
+        solver = self.prepare_solver()
+        _, placements, _ = solver.solve_anytime(time_budget - (time.perf_counter() - start))
+        stern_row = max(0, 2 * int(self.profile[-1]) - 1)
+        return (2 * len(placements) + stern_row) * max(1, self.height)
 
     def fill_stern(self):
         if not self.profile.any(): return
         stern_x_index = self.profile[-1]
         dist_from_center = stern_x_index 
         z_pos = 0
-        start_x = -(dist_from_center - 1)
         end_x = (dist_from_center - 1)
         guid_1m = self.beam_guids.get(1)
         if not guid_1m: return
-        if start_x <= end_x:
-            for x in range(start_x, end_x + 1):
-                beam_props = {"type": "beam", "len": 1, "offset": 0, "is_stern": False}
-                entry = {'pos': (x, 10, z_pos), 'rot': ROT_BEAM, 'guid': guid_1m, 'props': beam_props}
-                self.placements.append(entry)
+        if end_x >= 0:
+            xs = np.arange(0, end_x + 1)
+            self.placements.append(self.placements.batch(xs, 10, z_pos, ROT_BEAM, self.placements.block_id(guid_1m),
+                                                         1, KIND_BEAM, False, xs > 0))
 
     def stack_layers(self):
         if self.height <= 1: return
-        base_layer = list(self.placements)
-        self.placements = []
-        for h in range(self.height):
-            offset_y = h
-            for p in base_layer:
-                new_p = copy.deepcopy(p)
-                x, y, z = new_p['pos']
-                new_p['pos'] = (x, y - offset_y, z)
-                self.placements.append(new_p)
+        # The base layer rows stand for the whole deck; copies are only made on save
+        self.placements.rows["layers"] = self.height
 
     def generate_undercut(self):
-        if self.undercut <= 0: return
+        if self.undercut <= 0 or not len(self.placements): return
         
-        min_y = min(p['pos'][1] for p in self.placements)
-        parent_layer = [p for p in self.placements if p['pos'][1] == min_y]
+        rows = self.placements.rows
+        min_y, parent_layer = self.placements.bottom_layer()
         
-        max_z = max(p['pos'][2] for p in parent_layer) if parent_layer else 0
+        max_z = parent_layer["z"].max() if len(parent_layer) else 0
         ship_center_z = max_z / 2
+
+        # Offset block per (length, hand 0=left/1=right); -1 where the pair can't be mirrored
+        offset_block = np.full((256, 2), -1, dtype=np.int64)
+        for length, pair in self.offset_guids.items():
+            if pair["left"] in self.mirror_guids and pair["right"] in self.mirror_guids:
+                offset_block[length] = (self.placements.block_id(pair["left"]), self.placements.block_id(pair["right"]))
         
+        layers = []
         for u in range(1, self.undercut + 1):
             current_undercut_y = min_y - u
-            new_layer = []
-            occupied_coords = set() 
-            placed_offsets = [] 
             
-            for parent in parent_layer:
-                props = parent['props']
-                if props['type'] == 'beam': continue
-                
-                if props['type'] == 'slope':
-                    length = props['len']
-                    is_stern = props['is_stern']
-                    rot = parent['rot']
-                    
-                    offset_guid = None
-                    is_left_rot = rot in [ROT_LEFT_IN, ROT_LEFT_STERN, ROT_LEFT_OUT]
-                    is_right_rot = rot in [ROT_RIGHT_IN, ROT_RIGHT_STERN, ROT_RIGHT_OUT]
-                    
-                    if is_stern:
-                        if is_left_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["left"]
-                        elif is_right_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["right"]
-                    else:
-                        if is_left_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["right"]
-                        elif is_right_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["left"]
-                    
-                    if not offset_guid: continue 
-
-                    z_shift = 1 if is_stern else -1
-                    x, y, z = parent['pos']
-                    new_pos = (x, current_undercut_y, z + z_shift)
-                    
-                    if is_stern:
-                        for i in range(length): occupied_coords.add((new_pos[0], new_pos[2] - i))
-                    else:
-                        for i in range(length): occupied_coords.add((new_pos[0], new_pos[2] + i))
-                    
-                    new_entry = {
-                        'pos': new_pos, 'rot': rot, 'guid': offset_guid, 'props': props 
-                    }
-                    new_layer.append(new_entry)
-                    placed_offsets.append(new_entry)
-
-            raw_beam_voxels = []
-            for parent in parent_layer:
-                if parent['props']['type'] == 'beam':
-                    length = parent['props']['len']
-                    px, py, pz = parent['pos']
-                    
-                    beam_z_shift = -1 if pz > ship_center_z else 1
-                    shifted_pz = pz + beam_z_shift
-                    
-                    for z_offset in range(length):
-                        voxel_z = shifted_pz + z_offset
-                        voxel_x = px
-                        if (voxel_x, voxel_z) not in occupied_coords:
-                             raw_beam_voxels.append((voxel_x, voxel_z))
-                             occupied_coords.add((voxel_x, voxel_z))
-
-            for off in placed_offsets:
-                x = off['pos'][0]
-                z_anchor = off['pos'][2]
-                length = off['props']['len']
-                is_stern = off['props']['is_stern']
-                
-                if is_stern:
-                    start_z = z_anchor + 1
-                    direction = 1
-                else:
-                    start_z = z_anchor - 1
-                    direction = -1
-                
-                current_z = start_z
-                for _ in range(50): 
-                    if (x, current_z) in occupied_coords: break 
-                    has_neighbor = (x-1, current_z) in occupied_coords or (x+1, current_z) in occupied_coords
-                    
-                    raw_beam_voxels.append((x, current_z))
-                    occupied_coords.add((x, current_z))
-                    
-                    if has_neighbor: break
-                    current_z += direction
-
-            optimized_beams = self.optimize_beams(raw_beam_voxels, current_undercut_y)
-            new_layer.extend(optimized_beams)
+            sloped = parent_layer[parent_layer["kind"] != KIND_BEAM]
+            is_left_rot = np.isin(sloped["rot"], [ROT_LEFT_IN, ROT_LEFT_STERN, ROT_LEFT_OUT])
+            is_right_rot = np.isin(sloped["rot"], [ROT_RIGHT_IN, ROT_RIGHT_STERN, ROT_RIGHT_OUT])
+            # Stern slopes take the offset of their own hand, the others the opposite one
+            hand = (is_right_rot ^ ~sloped["is_stern"]).astype(np.int64)
+            block = offset_block[sloped["len"], hand]
+            keep = (is_left_rot | is_right_rot) & (block >= 0)
+
+            placed_offsets = sloped[keep]
+            placed_offsets["y"] = current_undercut_y
+            placed_offsets["z"] += np.where(placed_offsets["is_stern"], 1, -1).astype(np.int16)
+            placed_offsets["block"] = block[keep]
+            placed_offsets["kind"] = KIND_OFFSET
+
+            # Walks reach at most UNDERCUT_WALK_LIMIT past the parent layer (beams shift by 1)
+            occupied = OccupancyGrid.around(parent_layer, UNDERCUT_WALK_LIMIT + 2)
+            occupied.mark(*PlacementTable.cells(placed_offsets))
+
+            beams = parent_layer[parent_layer["kind"] == KIND_BEAM].copy()
+            beams["z"] += np.where(beams["z"] > ship_center_z, -1, 1).astype(np.int16)
+            beam_x, beam_z = PlacementTable.cells(beams)
+            free = ~occupied.occupied(beam_x, beam_z)
+            voxel_x = [beam_x[free]]
+            voxel_z = [beam_z[free]]
+            occupied.mark(beam_x, beam_z)
+
+            for x, z_anchor, is_stern in zip(placed_offsets["x"].tolist(), placed_offsets["z"].tolist(),
+                                             placed_offsets["is_stern"].tolist()):
+                direction = 1 if is_stern else -1
+                start_z = z_anchor + direction
+                steps = occupied.walk(x, start_z, direction, UNDERCUT_WALK_LIMIT)
+                walk_z = np.arange(start_z, start_z + direction * steps, direction)
+                voxel_x.append(np.full(steps, x))
+                voxel_z.append(walk_z)
+                occupied.mark(x, walk_z)
+
+            optimized_beams = self.optimize_beams(np.concatenate(voxel_x), np.concatenate(voxel_z), current_undercut_y)
+            parent_layer = np.concatenate([placed_offsets, optimized_beams])
+            layers.append(parent_layer)
             
-            self.placements.extend(new_layer)
-            parent_layer = new_layer
+        self.placements = self.placements.with_rows(np.concatenate([rows] + layers))
 
-    def generate_floor(self):
-        if not self.placements: return
-        
-        min_y = min(p['pos'][1] for p in self.placements)
-        occupied = set()
-        
-        for p in self.placements:
-            if p['pos'][1] == min_y:
-                length = p['props']['len']
-                px, py, pz = p['pos']
-                is_stern = p['props'].get('is_stern', False)
-                
-                if is_stern:
-                    for i in range(length): occupied.add((px, pz - i))
-                else:
-                    for i in range(length): occupied.add((px, pz + i))
+    def generate_inset_undercut(self):
+        # Layer u is the profile pulled in by u at the sides and by u stations at bow
+        # and stern, so every layer comes straight from the profile in one batch.
+        if self.undercut <= 0 or not len(self.placements): return
         
-        if not occupied: return
+        min_y, _ = self.placements.bottom_layer()
+        profile = np.asarray(self.profile, dtype=np.int64)
+        L = len(profile)
+        u = np.arange(1, self.undercut + 1)[:, None]
+        station = np.arange(L)[None, :]
+        width = profile[None, :] - u
+        inside = (station >= u) & (station <= L - 1 - u) & (width >= 0)
         
-        min_z = min(z for x, z in occupied)
-        max_z = max(z for x, z in occupied)
+        # Each station's outline runs in from its width to one past the narrower
+        # neighbour's, so steps in the profile stay closed. The end stations of a
+        # layer close it across the centerline.
+        none = np.iinfo(np.int64).max
+        width = np.where(inside, width, none)
+        prev_width = np.pad(width, ((0, 0), (1, 0)), constant_values=none)[:, :-1]
+        next_width = np.pad(width, ((0, 0), (0, 1)), constant_values=none)[:, 1:]
+        is_end = (prev_width == none) | (next_width == none)
+        inner = np.where(is_end, 0, np.minimum(width, np.minimum(prev_width, next_width) + 1))
         
-        raw_floor_voxels = []
+        layer, station = np.nonzero(inside)
+        outer = width[layer, station]
+        inner = inner[layer, station]
+        counts = outer - inner + 1
+        cell = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        xs = np.repeat(inner, counts) + cell
+        zs = np.repeat(L - 1 - station, counts) # Station s sits at blueprint z = L - 1 - s
+        ys = np.repeat(min_y - 1 - layer, counts)
         
-        for z in range(min_z, max_z + 1):
-            xs_at_z = [x for x, _z in occupied if _z == z]
-            if not xs_at_z: continue
-            
-            min_x = min(xs_at_z)
-            max_x = max(xs_at_z)
-            
-            for x in range(min_x + 1, max_x):
-                if (x, z) not in occupied:
-                    raw_floor_voxels.append((x, z))
-                    occupied.add((x, z))
-        
-        floor_beams = self.optimize_beams(raw_floor_voxels, min_y)
-        self.placements.extend(floor_beams)
-
-    def optimize_beams(self, voxels, y_level):
-        by_x = {}
-        for x, z in voxels:
-            if x not in by_x: by_x[x] = []
-            by_x[x].append(z)
-        
-        optimized = []
-        for x, z_list in by_x.items():
-            z_list = sorted(list(set(z_list))) 
-            if not z_list: continue
-            
-            runs = []
-            if z_list:
-                current_run = [z_list[0]]
-                for i in range(1, len(z_list)):
-                    if z_list[i] == z_list[i-1] + 1:
-                        current_run.append(z_list[i])
-                    else:
-                        runs.append(current_run)
-                        current_run = [z_list[i]]
-                runs.append(current_run)
-                
-            for run in runs:
-                start_z = run[0]
-                total_len = len(run)
-                current_fill_z = start_z
-                
-                while total_len > 0:
-                    chosen = 1
-                    for size in [4, 3, 2, 1]:
-                        if size <= total_len and size in self.beam_guids:
-                            chosen = size
-                            break
-                    
-                   # if chosen is None:
-                    #    current_fill_z += 1
-                    #    total_len -= 1
-                    #    continue
-
-                    guid = self.beam_guids[chosen]
-                    props = {"type": "beam", "len": chosen, "offset": 0, "is_stern": False}
-                    
-                    entry = {
-                        'pos': (x, y_level, current_fill_z),
-                        'rot': ROT_BEAM,
-                        'guid': guid,
-                        'props': props
-                    }
-                    optimized.append(entry)
-                    current_fill_z += chosen
-                    total_len -= chosen
-        return optimized
-
-    def simulate_hull(self, forced_1m_zone):
-        temp_placements = []
-        L = len(self.profile)
-        current_z = 0
-        current_min_len = 1 
-        total_penalty = 0
-        
-        while current_z < L:
-            x_current = self.profile[current_z]
-            dist_current = x_current 
-            
-            best_choice = None
-            min_step_cost = float('inf')
-            
-            all_lengths = sorted(list(set(list(self.slope_guids.keys()) + list(self.beam_guids.keys()))), reverse=True)
-            limit_len = 99
-            if current_z < forced_1m_zone: limit_len = 1
-            
-            candidates = []
-            for l in all_lengths:
-                if l > limit_len: continue
-                if l in self.slope_guids:
-                    candidates.append({"type": "slope", "len": l, "offset": -1, "is_stern": False, "guid": self.slope_guids[l]})
-                    candidates.append({"type": "slope", "len": l, "offset": 1, "is_stern": True, "guid": self.slope_guids[l]})
-                if l in self.beam_guids:
-                    candidates.append({"type": "beam", "len": l, "offset": 0, "is_stern": False, "guid": self.beam_guids[l]})
-
-            for cand in candidates:
-                b_len = cand["len"]
-                if current_z + b_len > L: continue
-                
-                target_x = self.profile[current_z + b_len - 1]
-                if current_z + b_len < L: target_x = self.profile[current_z + b_len]
-                else: target_x = self.profile[-1]
-
-                dist_ideal = dist_current - cand["offset"] 
-                error = abs(target_x - dist_ideal)
-                
-                if error > 1.0: continue 
-                
-                fit_penalty = error * 50 
-                len_penalty = (current_min_len - b_len) * 10 if b_len < current_min_len else -(b_len * 2)
-                efficiency_cost = 10 
-                total_step_cost = len_penalty + efficiency_cost + fit_penalty
-                
-                valid_lookahead = True
-                if b_len > 1:
-                    lookahead_z = current_z + int(b_len * 1.5)
-                    if lookahead_z < L:
-                        future_x = self.profile[lookahead_z]
-                        ratio = (lookahead_z - current_z) / b_len
-                        dist_fut_ideal = dist_current - (cand["offset"] * ratio)
-                        if abs(future_x - dist_fut_ideal) > 1.0: valid_lookahead = False
-                if not valid_lookahead: continue
-
-                if total_step_cost < min_step_cost:
-                    min_step_cost = total_step_cost
-                    best_choice = cand
-
-            if not best_choice:
-                total_penalty += 200
-                current_min_len = 1
-                if 1 in self.slope_guids:
-                    fb_cands = [
-                        {"type": "slope", "len": 1, "offset": -1, "is_stern": False, "guid": self.slope_guids[1]},
-                        {"type": "slope", "len": 1, "offset": 1, "is_stern": True, "guid": self.slope_guids[1]},
-                        {"type": "beam", "len": 1, "offset": 0, "is_stern": False, "guid": self.beam_guids.get(1)}
-                    ]
-                    best_err = float('inf')
-                    for c in fb_cands:
-                        if not c["guid"]: continue
-                        if current_z + c["len"] > L: continue
-                        tx = self.profile[current_z+1] if current_z+1 < L else self.profile[-1]
-                        di = dist_current - c["offset"]
-                        if abs(tx - di) < best_err: best_err = abs(tx - di); best_choice = c
-                
-                if not best_choice: current_z += 1; continue
+        self.placements.append(self.optimize_beams(xs, zs, ys))
 
-            total_penalty += min_step_cost
-            b_len = best_choice["len"]
-            current_min_len = b_len
-            
-            z_shift = 1 if best_choice["is_stern"] else b_len
-            placement_z = L - (current_z + z_shift)
-            
-            gx_left = -dist_current
-            gx_right = dist_current
-            rot_left = ROT_BEAM
-            rot_right = ROT_BEAM
-            
-            if best_choice["type"] == "slope":
-                if best_choice["is_stern"]:
-                    rot_left = ROT_LEFT_STERN
-                    rot_right = ROT_RIGHT_STERN
-                else:
-                    if best_choice["offset"] == -1: 
-                        rot_left = ROT_LEFT_OUT; rot_right = ROT_RIGHT_OUT; gx_left -= 1; gx_right += 1
-                    else:
-                        rot_left = ROT_LEFT_IN; rot_right = ROT_RIGHT_IN
-
-            entry_left = {'pos': (gx_left, 10, placement_z), 'rot': rot_left, 'guid': best_choice["guid"], 'props': best_choice}
-            entry_right = {'pos': (gx_right, 10, placement_z), 'rot': rot_right, 'guid': best_choice["guid"], 'props': best_choice}
-            
-            temp_placements.append(entry_left)
-            temp_placements.append(entry_right)
-            
-            current_z += b_len
-            
-        return total_penalty, temp_placements
+    def generate_floor(self):
+        if not len(self.placements): return
+        
+        min_y, bottom = self.placements.bottom_layer()
+        if not bottom["len"].any(): return
+        occupied = OccupancyGrid.around(bottom, 0)
+        xs, zs = PlacementTable.cells(bottom)
+        occupied.mark(xs, zs)
+        
+        # Outermost cell of every z row in one pass; port side mirrors, so the row spans -max_x..max_x
+        row_max_x = np.full(occupied.cells.shape[1], -1, dtype=np.int64)
+        np.maximum.at(row_max_x, zs - occupied.min_z, xs)
+        inside = np.arange(occupied.cells.shape[0])[:, None] < row_max_x[None, :]
+        fill_x, fill_z = np.nonzero(inside & ~occupied.cells)
+        
+        floor_beams = self.optimize_beams(fill_x, fill_z + occupied.min_z, min_y)
+        self.placements.append(floor_beams)
+
+    def optimize_beams(self, xs, zs, y_level):
+        # Packs voxel cells into beams along z: each unbroken run in an x column is
+        # filled greedily with the longest beams available (4m, 3m, 2m, 1m).
+        # y_level is one deck level or a level per voxel.
+        ys = np.broadcast_to(np.asarray(y_level, dtype=np.int64), np.shape(xs))
+        order = np.lexsort((zs, xs, ys))
+        xs = np.asarray(xs, dtype=np.int64)[order]
+        zs = np.asarray(zs, dtype=np.int64)[order]
+        ys = ys[order]
+        keep = np.ones(len(xs), dtype=bool)
+        keep[1:] = (np.diff(ys) != 0) | (np.diff(xs) != 0) | (np.diff(zs) != 0)
+        xs, zs, ys = xs[keep], zs[keep], ys[keep]
+
+        breaks = np.ones(len(xs), dtype=bool)
+        breaks[1:] = (np.diff(ys) != 0) | (np.diff(xs) != 0) | (np.diff(zs) != 1)
+        run_start = np.flatnonzero(breaks)
+        run_len = np.diff(np.append(run_start, len(xs)))
+
+        # Greedy longest-first is the same as dividing down through the sizes
+        sizes = [size for size in [4, 3, 2, 1] if size in self.beam_guids]
+        counts = np.zeros((len(run_start), len(sizes)), dtype=np.int64)
+        remaining = run_len
+        for i, size in enumerate(sizes):
+            counts[:, i], remaining = np.divmod(remaining, size)
+
+        lens = np.repeat(np.tile(sizes, len(run_start)), counts.ravel())
+        run = np.repeat(np.arange(len(run_start)), counts.sum(axis=1))
+        # Offset of each beam inside its run: lengths of the beams before it
+        before = np.cumsum(lens) - lens
+        run_offset = np.cumsum(run_len) - run_len
+        beam_z = zs[run_start][run] + before - run_offset[run]
+        beam_x = xs[run_start][run]
+        beam_y = ys[run_start][run]
+
+        beam_block = np.zeros(max(self.beam_guids) + 1, dtype=np.uint16)
+        for size, guid in self.beam_guids.items(): beam_block[size] = self.placements.block_id(guid)
+        return self.placements.batch(beam_x, beam_y, beam_z, ROT_BEAM, beam_block[lens], lens, KIND_BEAM, False, beam_x > 0)
+
+    def final_blocks(self, rows, mirror_block):
+        # Rows as written: deck layers expanded, each mirrored block right after its port twin
+        rows = PlacementTable.expand_layers(rows)
+        counts = 1 + rows["mirror"]
+        blocks = np.repeat(rows, counts)
+        twins = (np.cumsum(counts) - counts)[rows["mirror"]]
+        mirror_rot = np.arange(256, dtype=np.uint8)
+        for rot, twin_rot in MIRROR_ROT.items(): mirror_rot[rot] = twin_rot
+        blocks["x"][twins] = -blocks["x"][twins]
+        blocks["rot"][twins] = mirror_rot[blocks["rot"][twins]]
+        blocks["block"][twins] = mirror_block[blocks["block"][twins]]
+        return blocks
+
+    def block_chunks(self, mirror_block):
+        # final_blocks() of the whole table, about SAVE_CHUNK_BLOCKS at a time
+        rows = self.placements.rows
+        written = np.cumsum(rows["layers"].astype(np.int64) * (1 + rows["mirror"]))
+        total = int(written[-1]) if len(rows) else 0
+        splits = np.searchsorted(written, np.arange(SAVE_CHUNK_BLOCKS, total, SAVE_CHUNK_BLOCKS), side="right")
+        for chunk in np.split(rows, splits):
+            if len(chunk): yield self.final_blocks(chunk, mirror_block)
 
     def save_to_blueprint(self):
         if not os.path.exists(DONOR_BLUEPRINT): 
-            messagebox.showerror("Error", f"Missing {DONOR_BLUEPRINT}")
-            return
-        with open(DONOR_BLUEPRINT, "r") as f: bp = json.load(f)
+            raise GeneratorError(f"Missing {DONOR_BLUEPRINT}")
+        template = get_donor_template()
         
-        bp["Blueprint"]["SCs"] = []; bp["Blueprint"]["BP1"] = None; bp["Blueprint"]["BP2"] = None
         guid_map = {}; next_id = 1000
-        bp["Blueprint"]["BLP"] = []; bp["Blueprint"]["BLR"] = []; bp["Blueprint"]["BlockIds"] = []; bp["Blueprint"]["BCI"] = []
         
-        for p in self.placements:
-            pos = p['pos']
-            rot = p['rot']
-            guid = p['guid']
-            
-            if guid not in guid_map: guid_map[guid] = next_id; next_id += 1
-            bp["Blueprint"]["BLP"].append(f"{int(pos[0])},{int(pos[1])},{int(pos[2])}")
-            bp["Blueprint"]["BLR"].append(int(rot))
-            bp["Blueprint"]["BlockIds"].append(int(guid_map[guid]))
-            bp["Blueprint"]["BCI"].append(0)
-
-        if "ItemDictionary" not in bp: bp["ItemDictionary"] = {}
-        for g, i in guid_map.items(): bp["ItemDictionary"][str(i)] = g
+        table = self.placements
+        rows = table.rows
+        mirror_block = np.array([table.block_id(self.mirror_guids.get(g, g)) for g in list(table.guids)], dtype=np.uint16)
+
+        # Item ids are handed out in order of first use. Stacked copies repeat their
+        # row's block, so the compact rows (twin first) give the same order.
+        in_order = np.repeat(rows["block"], 1 + rows["mirror"])
+        twins = (np.cumsum(1 + rows["mirror"]) - 1 - rows["mirror"])[rows["mirror"]]
+        in_order[twins] = mirror_block[in_order[twins]]
+        used, first = np.unique(in_order, return_index=True)
+        used = used[np.argsort(first)]
+        item_ids = np.zeros(len(table.guids), dtype=np.int64)
+        item_ids[used] = next_id + np.arange(len(used))
+        for b in used.tolist(): guid_map[table.guids[b]] = int(item_ids[b])
+
+        items = dict(template.items)
+        for g, i in guid_map.items(): items[str(i)] = g
         
-        count = len(self.placements)
-        bp["Blueprint"]["BlockState"] = f"=0,{count}"
-        bp["Blueprint"]["TotalBlockCount"] = count
-        bp["Blueprint"]["AliveCount"] = count
-        bp["SavedTotalBlockCount"] = count
+        # Counts and bounds come from the compact rows: a row stands for
+        # layers blocks, plus as many port twins when mirrored.
+        mirrored = rows["mirror"]
+        layers = rows["layers"].astype(np.int64)
+        block_counts = (np.bincount(rows["block"], weights=layers, minlength=len(table.guids)) +
+                        np.bincount(mirror_block[rows["block"][mirrored]], weights=layers[mirrored], minlength=len(table.guids)))
+        count = int(block_counts.sum())
+        if len(rows):
+            x = rows["x"].astype(np.int64)
+            min_cords = (int(min(x.min(), -x[mirrored].max(initial=0))), int((rows["y"] - layers + 1).min()), int(rows["z"].min()))
+            max_cords = (int(max(x.max(), -x[mirrored].min(initial=0))), int(rows["y"].max()), int(rows["z"].max()))
+        else:
+            min_cords = max_cords = (0, 0, 0)
+        self.report = {"blocks": count, "min_cords": min_cords, "max_cords": max_cords,
+                       "block_counts": {table.guids[b]: int(n) for b, n in enumerate(block_counts.tolist()) if n}}
+
+        def stream(to_items):
+            def write(f):
+                f.write(b"[")
+                separator = b""
+                for blocks in self.block_chunks(mirror_block):
+                    f.write(separator + to_items(blocks))
+                    separator = b", "
+                f.write(b"]")
+            return write
+
+        values = {
+            "BLP": stream(lambda blocks: join_rows(b'"', ascii_ints(blocks["x"]), b",", ascii_ints(blocks["y"]), b",",
+                                                   ascii_ints(blocks["z"]), b'"')),
+            "BLR": stream(lambda blocks: join_rows(ascii_ints(blocks["rot"]))),
+            "BCI": stream(lambda blocks: b", ".join([b"0"] * len(blocks))),
+            "BlockIds": stream(lambda blocks: join_rows(ascii_ints(item_ids[blocks["block"]]))),
+            "ItemDictionary": json.dumps(items).encode("utf-8"),
+            "BlockState": json.dumps(f"=0,{count}").encode("utf-8"),
+            "TotalBlockCount": str(count).encode("utf-8"),
+            "AliveCount": str(count).encode("utf-8"),
+            "SavedTotalBlockCount": str(count).encode("utf-8"),
+            "BlockCount": str(count).encode("utf-8"),
+            "MinCords": json.dumps("%d,%d,%d" % min_cords).encode("utf-8"),
+            "MaxCords": json.dumps("%d,%d,%d" % max_cords).encode("utf-8"),
+        }
         
         # --- OUTPUT LOGIC ---
-        if self.save_path:
+        if self.out_file:
+            out_file = self.out_file
+        elif self.save_path:
             out_file = os.path.join(self.save_path, OUTPUT_FILENAME)
         else:
             # Fallback to script directory if no path selected
             out_file = os.path.join(BASE_DIR, OUTPUT_FILENAME)
         
-        with open(out_file, "w") as f: json.dump(bp, f)
-
-if __name__ == "__main__":
+        # Written next to the target and renamed over it, so a failed export never leaves a partial file
+        tmp_file = out_file + f".{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                template.write(f, values)
+            os.replace(tmp_file, out_file)
+        except BaseException:
+            # Don't leave the half-written file in the user's Constructs folder
+            try: os.remove(tmp_file)
+            except OSError: pass
+            raise
+        size = [hi - lo + 1 for lo, hi in zip(min_cords, max_cords)]
+        print(f"Saved {count} blocks, size {size[0]}x{size[1]}x{size[2]}m.")
+
+def outline_profile(data):
+    """Profile from a hull outline: a list of [z, x] points, or {"points": [...]}."""
+    points = data.get("points", []) if isinstance(data, dict) else data
+    if not isinstance(points, list):
+        raise ValueError("outline must be a list of [z, x] points")
+    number = lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+    for point in points:
+        if not (isinstance(point, list) and len(point) == 2 and all(number(v) for v in point)):
+            raise ValueError(f"point {json.dumps(point)} is not a [z, x] pair of numbers")
+        if point[0] < 0 or point[1] < 0:
+            raise ValueError(f"point {json.dumps(point)} has a negative length or half-width")
+    points = sorted((int(z), int(x)) for z, x in points)
+    if len(points) < 2:
+        raise ValueError("needs at least two [z, x] points")
+    return profile_from_points(points)
+
+
+def load_profile(path):
+    with open(path, "r") as f:
+        return outline_profile(json.load(f))
+
+
+def init_batch_worker():
+    # Parsed once per process; every job the worker runs reuses them
+    get_material_catalog()
+    get_donor_template()
+
+
+BATCH_JOB_KEYS = {"name", "points", "profile", "height", "undercut", "material", "floor", "solver", "trial_budget",
+                  "undercut_style"}
+
+
+def job_option(job, key, default, valid, expected):
+    value = job.get(key, default)
+    if not valid(value):
+        raise ValueError(f"{key} must be {expected}, got {json.dumps(value)}")
+    return value
+
+
+def run_batch_job(number, name, job, out_dir, base_dir, use_cache):
+    """Builds one batch job and returns its results record.
+
+    Keys of a job: name, points (or profile, an outline file relative to the
+    jobs file), height, undercut, material, floor, solver, trial_budget,
+    undercut_style.
+    Values are checked as strictly as the generate command checks its options.
+    The blueprint goes to out_dir/<name>.blueprint.
+    """
+    start = time.perf_counter()
+    result = {"job": number, "name": name, "status": "error"}
+    log = io.StringIO()
+    try:
+        unknown = sorted(set(job) - BATCH_JOB_KEYS)
+        if unknown:
+            raise ValueError(f"unknown job keys: {', '.join(unknown)}")
+        whole = lambda v: isinstance(v, int) and not isinstance(v, bool)
+        height = job_option(job, "height", 3, lambda v: whole(v) and v >= 1, "a whole number of at least 1")
+        undercut = job_option(job, "undercut", 5, lambda v: whole(v) and v >= 0, "a whole number of at least 0")
+        material = job_option(job, "material", "Alloy", lambda v: isinstance(v, str), "a material name")
+        do_floor = job_option(job, "floor", True, lambda v: isinstance(v, bool), "true or false")
+        solver = job_option(job, "solver", "sweep", lambda v: v in SOLVER_MODES, "one of " + ", ".join(SOLVER_MODES))
+        trial_budget = job_option(job, "trial_budget", ADAPTIVE_TRIAL_BUDGET, lambda v: whole(v) and v >= 1,
+                                  "a whole number of at least 1")
+        undercut_mode = job_option(job, "undercut_style", "trace", lambda v: v in UNDERCUT_MODES,
+                                   "one of " + ", ".join(UNDERCUT_MODES))
+        if "profile" in job:
+            profile = load_profile(os.path.join(base_dir, job["profile"]))
+        else:
+            profile = outline_profile(job.get("points", []))
+        out_file = os.path.join(out_dir, name + ".blueprint")
+        generator = BlueprintGenerator(profile, 0, height, undercut, do_floor, None, material, solver,
+                                       trial_budget=trial_budget, use_cache=use_cache, undercut_mode=undercut_mode, out_file=out_file)
+        # Solver progress would interleave between workers, so only the record is reported
+        with contextlib.redirect_stdout(log):
+            generator.generate()
+        result.update(status="ok", out=out_file, blocks=generator.report["blocks"],
+                      timings={k: round(v, 4) for k, v in generator.timings.items()})
+    except Exception as e: # One bad job must not stop the rest of the batch
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def read_batch_jobs(f):
+    """Yields (number, name, job, error) for each non-blank line of a jobs file.
+
+    job is None and error set when the line is not a JSON object. Names are
+    made file-safe and unique: a name already taken gets the job number added,
+    so two jobs never write the same blueprint.
+    """
+    taken = set()
+    for number, line in enumerate(f, 1):
+        if not line.strip(): continue
+        job, error = None, None
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("job must be a JSON object")
+        except ValueError as e:
+            job, error = None, str(e)
+        name = re.sub(r"[^\w.-]", "_", str(job.get("name", f"hull_{number}") if job else f"hull_{number}"))
+        while name.lower() in taken:
+            name = f"{name}_{number}"
+        taken.add(name.lower())
+        yield number, name, job, error
+
+
+def run_batch(jobs_path, out_dir, workers, results, use_cache):
+    """Streams jobs from a JSONL file through a process pool, writing one results line per job.
+
+    Only a few jobs per worker are read ahead, so the jobs file can be any length.
+    Returns the number of failed jobs.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    base_dir = os.path.dirname(os.path.abspath(jobs_path))
+    failed = 0
+
+    def report(result):
+        nonlocal failed
+        if result["status"] != "ok": failed += 1
+        results.write(json.dumps(result) + "\n")
+        results.flush()
+
+    with open(jobs_path, "r") as f:
+        def runnable():
+            # Lines that are not JSON objects are reported here; the rest go to the workers
+            for number, name, job, error in read_batch_jobs(f):
+                if error is None:
+                    yield number, name, job
+                else:
+                    report({"job": number, "name": name, "status": "error", "error": error, "seconds": 0.0})
+
+        if workers <= 1:
+            init_batch_worker()
+            for number, name, job in runnable():
+                report(run_batch_job(number, name, job, out_dir, base_dir, use_cache))
+            return failed
+
+        # The material index is built here first so workers load it from
+        # MATERIAL_CACHE_FILE instead of each rebuilding it.
+        get_material_catalog()
+        pending = set()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker) as pool:
+            for number, name, job in runnable():
+                pending.add(pool.submit(run_batch_job, number, name, job, out_dir, base_dir, use_cache))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done: report(future.result())
+            for future in wait(pending).done: report(future.result())
+    return failed
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1: raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def non_negative_int(text):
+    value = int(text)
+    if value < 0: raise argparse.ArgumentTypeError(f"must be at least 0, got {value}")
+    return value
+
+
+def main(argv):
+    """Command line entry point. Returns the exit code: 0 saved, 1 export (or any batch job) failed, 2 bad arguments."""
+    parser = argparse.ArgumentParser(prog="Generator.py", description="Generate FTD hull blueprints without the editor.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser("generate", help="build one blueprint from an outline file")
+    gen.add_argument("--profile", required=True, help="JSON outline: [[z, x], ...] or {\"points\": [...]}")
+    gen.add_argument("--height", type=positive_int, default=3)
+    gen.add_argument("--undercut", type=non_negative_int, default=5)
+    gen.add_argument("--material", default="Alloy")
+    gen.add_argument("--out", default=os.path.join(BASE_DIR, OUTPUT_FILENAME))
+    gen.add_argument("--no-floor", action="store_true")
+    gen.add_argument("--solver", choices=SOLVER_MODES, default="sweep")
+    gen.add_argument("--trial-budget", type=positive_int, default=ADAPTIVE_TRIAL_BUDGET,
+                     help="max trials for --solver adaptive (default %(default)s)")
+    gen.add_argument("--workers", type=positive_int, default=1)
+    gen.add_argument("--undercut-style", choices=UNDERCUT_MODES, default="trace")
+    gen.add_argument("--no-cache", action="store_true")
+    batch = commands.add_parser("batch", help="build one blueprint per line of a JSONL jobs file")
+    batch.add_argument("--jobs", required=True, help="JSONL file, one job object per line")
+    batch.add_argument("--out-dir", default=os.path.join(BASE_DIR, "batch"))
+    batch.add_argument("--workers", type=positive_int, default=MAX_SOLVER_WORKERS)
+    batch.add_argument("--results", default="-", help="results JSONL file, - for stdout")
+    batch.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        if not os.path.exists(args.jobs):
+            parser.error(f"cannot read jobs {args.jobs}")
+        if not os.path.exists(DONOR_BLUEPRINT):
+            print(f"Error: Missing {DONOR_BLUEPRINT}", file=sys.stderr)
+            return 1
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            results = sys.stdout if args.results == "-" else stack.enter_context(open(args.results, "w"))
+            failed = run_batch(args.jobs, args.out_dir, args.workers, results, not args.no_cache)
+        print(f"Batch finished in {time.perf_counter() - start:.2f}s, {failed} job(s) failed.", file=sys.stderr)
+        return 1 if failed else 0
+
+    try:
+        profile = load_profile(args.profile)
+    except (OSError, ValueError, TypeError) as e:
+        parser.error(f"cannot read profile {args.profile}: {e}")
+
+    start = time.perf_counter()
+    try:
+        generator = BlueprintGenerator(profile, 0, args.height, args.undercut, not args.no_floor, None, args.material,
+                                       args.solver, args.workers, args.trial_budget, use_cache=not args.no_cache,
+                                       undercut_mode=args.undercut_style, out_file=args.out)
+        generator.generate()
+    except (GeneratorError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    t = generator.timings
+    print(f"Wrote {args.out} in {time.perf_counter() - start:.2f}s "
+          f"(solve {t['solve']:.2f}s, build {t['build']:.2f}s, save {t['save']:.2f}s).")
+    return 0
+
+
+def run_gui():
+    # tkinter is only imported for the editor, so the command line runs on headless installs
+    global tk, messagebox, filedialog, ttk
+    import tkinter as tk
+    from tkinter import messagebox, filedialog, ttk
     root = tk.Tk()
     app = HullDesigner(root)
     root.mainloop()
-    ###
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+    run_gui()
@@ -0,0 +1,55 @@
+"""The half-hull pipeline must export the same blocks as the full-hull one.
+
+tests/data/full_hull.json.gz holds the preset and 30 seeded random profiles,
+each with the sorted (BLP, BLR, GUID) triples written by the generator as it
+was before placements were reduced to the starboard half (commit 0790ca0).
+Block order in the file may differ, so triples are compared sorted. Since
+user-019 wood hulls use the plain Wood block for 1m pieces where the old
+generator picked Wood Block Variant 9; the reference is mapped accordingly.
+"""
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Generator
+
+GOLDEN = os.path.join(ROOT, "tests", "data", "full_hull.json.gz")
+
+# Wood Block Variant 9 -> Wood block
+RENAMED_GUIDS = {"1e311aa8-7a58-4ed9-a62e-bf236cf32982": "9a0ae372-beb4-4009-b14e-36ed0715af73"}
+
+
+def export_triples(case, out_dir):
+    profile = Generator.profile_from_points(case["points"])
+    out_file = os.path.join(out_dir, case["name"] + ".blueprint")
+    generator = Generator.BlueprintGenerator(profile, 40, case["height"], case["undercut"], case["floor"], None,
+                                             case["material"], use_cache=False, out_file=out_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.generate()
+    with open(out_file, "r") as f:
+        bp = json.load(f)
+    blueprint, items = bp["Blueprint"], bp["ItemDictionary"]
+    return sorted([p, r, items[str(i)]] for p, r, i in zip(blueprint["BLP"], blueprint["BLR"], blueprint["BlockIds"]))
+
+
+class HalfHullTest(unittest.TestCase):
+    def test_matches_full_hull_export(self):
+        with gzip.open(GOLDEN, "rt") as f:
+            cases = json.load(f)
+        with tempfile.TemporaryDirectory() as out_dir:
+            for case in cases:
+                with self.subTest(case["name"]):
+                    expected = sorted([p, r, RENAMED_GUIDS.get(g, g)] for p, r, g in case["blocks"])
+                    self.assertEqual(export_triples(case, out_dir), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
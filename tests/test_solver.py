@@ -0,0 +1,97 @@
+"""HullSolver shortcuts must give the same hull as solving from scratch.
+
+Covers the shared suffix memo and pruning (every zone tried on its own, the
+earliest best zone wins), the process-pool sweep (same result as one worker)
+and incremental re-solves after designer edits (same result as a fresh
+HullSolver on the edited profile). Profiles are seeded random outlines with
+long constant stretches, so the mid-body run jumps are exercised as well.
+"""
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Generator
+
+
+def random_points(rng):
+    points = [(0, rng.randint(0, 2))]
+    for _ in range(rng.randint(1, 6)):
+        points.append((points[-1][0] + rng.choice([1, 3, 8, 20, 60]), rng.randint(0, 12)))
+    return points
+
+
+def edit_points(rng, points):
+    # One designer edit: add a point, remove the last one, or move one
+    points = list(points)
+    action = rng.choice(["append", "pop", "move", "move_last"])
+    if action == "append" or len(points) < 3:
+        points.append((points[-1][0] + rng.randint(1, 40), rng.randint(0, 12)))
+    elif action == "pop":
+        points.pop()
+    elif action == "move":
+        i = rng.randint(1, len(points) - 2)
+        points[i] = (points[i][0], rng.randint(0, 12))
+    else:
+        points[-1] = (points[-1][0], rng.randint(0, 12))
+    return points
+
+
+def new_solver(points, material):
+    assets = Generator.get_material_catalog().get(material)
+    return Generator.HullSolver(Generator.profile_from_points(points), assets["slope"], assets["beam"])
+
+
+class HullSolverTest(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        if Generator._solver_pool is not None:
+            Generator._solver_pool.shutdown()
+            Generator._solver_pool = None
+
+    def test_sweep_matches_independent_trials(self):
+        rng = random.Random(4)
+        for case in range(40):
+            points, material = random_points(rng), rng.choice(Generator.MATERIALS)
+            with self.subTest(case=case, points=points, material=material):
+                solver = new_solver(points, material)
+                score, placements, _ = solver.sweep()
+                best_score, best_placements = float('inf'), []
+                for zone in range(0, min(25, len(solver.profile) + 1)):
+                    trial_score, trial_placements = new_solver(points, material).simulate(zone)
+                    if trial_score < best_score:
+                        best_score, best_placements = trial_score, trial_placements
+                self.assertEqual(score, best_score)
+                self.assertEqual(placements, best_placements)
+
+    def test_pool_sweep_matches_single_worker(self):
+        rng = random.Random(2)
+        for case in range(30):
+            points, material = random_points(rng), rng.choice(Generator.MATERIALS)
+            with self.subTest(case=case, points=points, material=material):
+                single = new_solver(points, material).sweep(workers=1)
+                pooled = new_solver(points, material).sweep(workers=3)
+                self.assertEqual(pooled[:2], single[:2])
+
+    def test_incremental_resolve_matches_fresh_solve(self):
+        rng = random.Random(8)
+        for design in range(10):
+            points, material = random_points(rng), rng.choice(Generator.MATERIALS)
+            assets = Generator.get_material_catalog().get(material)
+            solver = new_solver(points, material)
+            solver.sweep()
+            for edit in range(30):
+                points = edit_points(rng, points)
+                with self.subTest(design=design, edit=edit, points=points, material=material):
+                    solver.update_profile(Generator.profile_from_points(points), assets["slope"], assets["beam"])
+                    resumed = solver.sweep()
+                    fresh = new_solver(points, material).sweep()
+                    self.assertEqual(resumed[:2], fresh[:2])
+                    self.assertGreater(resumed[2]["trials_resumed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()